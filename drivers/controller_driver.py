@@ -5,8 +5,22 @@ Handles all control/actuator devices with unified interface
 
 import time
 import utime
+import micropython
 
 from machine import I2C, Pin
+from micropython import const
+
+# Verbose tracing of controller commands (each print blocks on the UART).
+# Folded by the compiler: with _DEBUG off the guarded prints are dead code
+_DEBUG = const(0)
+
+
+@micropython.viper
+def _pack(buf: ptr8, reg: int, value: int):
+    """Pack RDA5807 register address and 16-bit value into buf (native code)"""
+    buf[0] = reg | 0x20
+    buf[1] = (value >> 8) & 0xFF
+    buf[2] = value & 0xFF
 
 
 class ControllerDevice:
@@ -16,22 +30,31 @@ class ControllerDevice:
         self.name = name
         self.i2c_bus = i2c_bus
         self.address = address
+        self.address_hex = hex(address)
         self.detected = False
         self.initialized = False
         self.error_count = 0
         self.last_command = 0
+        self._dirty = False  # last_command resolved lazily in get_status
+        
+    def detect(self, verbose=False):
+        """Check if controller is present (single address probe)"""
+        if verbose:
+            try:
+                scanned_devices = self.i2c_bus.scan()
+                print(f"[FM] I2C scan results: {scanned_devices}")
+                print(f"[FM] Looking for address {hex(self.address)}")
+                found = self.address in scanned_devices
+                print(f"[FM] Device found at {hex(self.address)}: {found}")
+                return found
+            except Exception as e:
+                print(f"[FM] I2C scan error: {e}")
+                return False
         
-    def detect(self):
-        """Check if controller is present"""
         try:
-            scanned_devices = self.i2c_bus.scan()
-            print(f"[FM] I2C scan results: {scanned_devices}")
-            print(f"[FM] Looking for address {hex(self.address)}")
-            found = self.address in scanned_devices
-            print(f"[FM] Device found at {hex(self.address)}: {found}")
-            return found
-        except Exception as e:
-            print(f"[FM] I2C scan error: {e}")
+            self.i2c_bus.writeto(self.address, b'')
+            return True
+        except OSError:
             return False
     
     def initialize(self):
@@ -54,11 +77,23 @@ class ControllerDevice:
 class FMTransmitterRDA5807(ControllerDevice):
     """RDA5807 FM Transmitter"""
     
+    MIN_FREQ = 88.0
+    MAX_FREQ = 108.0
+    MAX_VOLUME = 15
+    
     def __init__(self, i2c_bus, address = 0x11):
         super().__init__("RDA5807", i2c_bus, address)
         self.frequency = 100.5
         self.volume = 7
         self.muted = False
+        # Shadow of the writable registers, avoids read-modify-write round trips
+        self._regs = {0x02: 0x8001, 0x03: 0x0000, 0x04: 0x0000, 0x05: 0x0000}
+        self._wrbuf = bytearray(3)
+        self._rdbuf = bytearray(2)
+        # Status register 0x0A cache (RSSI/stereo change slowly)
+        self._reg0A_cache = 0
+        self._reg0A_ts = 0
+        self._reg0A_valid = False
         
     def initialize(self):
         """Initialize RDA5807 FM transmitter"""
@@ -67,16 +102,22 @@ class FMTransmitterRDA5807(ControllerDevice):
             self._write_reg(0x02, 0x0002)
             time.sleep(0.1)
             
-            # Enable output and set default settings
-            self._write_reg(0x02, 0x8001)  # Enable, Bass boost off
-            self._write_reg(0x03, 0x0000)  # Default
+            # Seed the shadow with the chip's reset values; defaults stay if the read fails
+            self._resync()
             
-            # Set initial frequency and volume
-            self.set_frequency(self.frequency)
-            self.set_volume(self.volume)
+            # Enable output, initial frequency and volume in one sequential write;
+            # 0x04 and the upper bits of 0x05 keep the values seeded above
+            regs = self._regs
+            freq_int = int((self.frequency - 88.0) * 10) + 0x1000
+            self._write_regs(0x02, (
+                0x8001,                                        # 0x02: Enable, Bass boost off
+                freq_int,                                      # 0x03: Frequency
+                regs[0x04],                                    # 0x04: De-emphasis, softmute
+                (regs[0x05] & 0xFFF0) | (self.volume & 0x0F)   # 0x05: Volume
+            ))
             
             self.initialized = True
-            print(f"[FM] RDA5807 initialized at {hex(self.address)}")
+            print(f"[FM] RDA5807 initialized at {self.address_hex}")
             return True
             
         except Exception as e:
@@ -85,17 +126,39 @@ class FMTransmitterRDA5807(ControllerDevice):
     
     def _write_reg(self, reg, value):
         """Write to RDA5807 register"""
-        data = bytearray([reg | 0x20, (value >> 8) & 0xFF, value & 0xFF])
-        self.i2c_bus.writeto(self.address, data)
-        time.sleep(0.01)
+        buf = self._wrbuf
+        _pack(buf, reg, value)
+        self.i2c_bus.writeto(self.address, buf)
+        self._regs[reg] = value
+        utime.sleep_us(100)  # tWR ~100us
+    
+    def _write_regs(self, start_reg, values):
+        """Write consecutive RDA5807 registers in a single I2C transfer"""
+        buf = bytearray(1 + 2 * len(values))
+        buf[0] = start_reg | 0x20
+        for i, value in enumerate(values):
+            buf[1 + 2 * i] = (value >> 8) & 0xFF
+            buf[2 + 2 * i] = value & 0xFF
+            self._regs[start_reg + i] = value
+        self.i2c_bus.writeto(self.address, buf)
+        utime.sleep_us(100)  # tWR ~100us
     
     def _read_reg(self, reg):
-        """Read from RDA5807 register"""
+        """Read from RDA5807 register, None if the bus read fails"""
+        buf = self._rdbuf
         try:
-            data = self.i2c_bus.readfrom_mem(self.address, reg | 0x20, 2)
-            return (data[0] << 8) | data[1]
-        except:
-            return 0
+            self.i2c_bus.readfrom_mem_into(self.address, reg | 0x20, buf)
+            return (buf[0] << 8) | buf[1]
+        except OSError:
+            return None
+    
+    def _resync(self):
+        """Reload shadow registers from the chip after an I2C error"""
+        for reg in self._regs:
+            value = self._read_reg(reg)
+            # Keep the previous shadow on a failed read: zeros would clear ENABLE/DMUTE on the next write
+            if value is not None:
+                self._regs[reg] = value
     
     def set_frequency(self, freq_mhz):
         """Set FM frequency (88.0 - 108.0 MHz)"""
@@ -103,22 +166,28 @@ class FMTransmitterRDA5807(ControllerDevice):
             return False
             
         try:
-            freq_mhz = max(88.0, min(108.0, freq_mhz))
-            freq_int = int((freq_mhz - 88.0) * 10) + 0x1000
+            if freq_mhz < self.MIN_FREQ:
+                freq_mhz = self.MIN_FREQ
+            elif freq_mhz > self.MAX_FREQ:
+                freq_mhz = self.MAX_FREQ
+            if freq_mhz == self.frequency:
+                return True  # Already tuned, skip the I2C write
+            freq_int = int((freq_mhz - self.MIN_FREQ) * 10) + 0x1000
             
-            # Read current register 0x03
-            reg03 = self._read_reg(0x03)
+            reg03 = self._regs[0x03]
             reg03 = (reg03 & 0xFE00) | freq_int
             
             self._write_reg(0x03, reg03)
             self.frequency = freq_mhz
-            self.last_command = utime.ticks_ms()
+            self._dirty = True
             
-            print(f"[FM] Frequency set to {freq_mhz:.1f} MHz")
+            if _DEBUG:
+                print(f"[FM] Frequency set to {freq_mhz:.1f} MHz")
             return True
             
         except Exception as e:
             self.error_count += 1
+            self._resync()
             print(f"[FM] Frequency set error: {e}")
             return False
     
@@ -128,21 +197,27 @@ class FMTransmitterRDA5807(ControllerDevice):
             return False
             
         try:
-            volume = max(0, min(15, volume))
+            if volume < 0:
+                volume = 0
+            elif volume > self.MAX_VOLUME:
+                volume = self.MAX_VOLUME
+            if volume == self.volume:
+                return True
             
-            # Read current register 0x05
-            reg05 = self._read_reg(0x05)
+            reg05 = self._regs[0x05]
             reg05 = (reg05 & 0xFFF0) | volume
             
             self._write_reg(0x05, reg05)
             self.volume = volume
-            self.last_command = utime.ticks_ms()
+            self._dirty = True
             
-            print(f"[FM] Volume set to {volume}")
+            if _DEBUG:
+                print(f"[FM] Volume set to {volume}")
             return True
             
         except Exception as e:
             self.error_count += 1
+            self._resync()
             print(f"[FM] Volume set error: {e}")
             return False
     
@@ -151,9 +226,11 @@ class FMTransmitterRDA5807(ControllerDevice):
         if not self.initialized:
             return False
             
+        if muted == self.muted:
+            return True
+            
         try:
-            # Read current register 0x02
-            reg02 = self._read_reg(0x02)
+            reg02 = self._regs[0x02]
             if muted:
                 reg02 |= 0x4000  # Set mute bit
             else:
@@ -161,13 +238,15 @@ class FMTransmitterRDA5807(ControllerDevice):
                 
             self._write_reg(0x02, reg02)
             self.muted = muted
-            self.last_command = utime.ticks_ms()
+            self._dirty = True
             
-            print(f"[FM] Mute: {muted}")
+            if _DEBUG:
+                print(f"[FM] Mute: {muted}")
             return True
             
         except Exception as e:
             self.error_count += 1
+            self._resync()
             print(f"[FM] Mute set error: {e}")
             return False
     
@@ -176,18 +255,31 @@ class FMTransmitterRDA5807(ControllerDevice):
         if not self.initialized:
             return {
                 'name': self.name,
-                'address': hex(self.address),
+                'address': self.address_hex,
                 'detected': self.detected,
                 'initialized': False,
                 'error_count': self.error_count
             }
         
         try:
-            reg0A = self._read_reg(0x0A)  # Status register
+            now = utime.ticks_ms()
+            if self._dirty:
+                self.last_command = now
+                self._dirty = False
+            if self._reg0A_valid and 0 <= utime.ticks_diff(now, self._reg0A_ts) < 200:
+                reg0A = self._reg0A_cache
+            else:
+                reg0A = self._read_reg(0x0A)  # Status register
+                if reg0A is None:
+                    reg0A = 0  # Report no signal, retry on the next call
+                else:
+                    self._reg0A_cache = reg0A
+                    self._reg0A_ts = now
+                    self._reg0A_valid = True
             
             return {
                 'name': self.name,
-                'address': hex(self.address),
+                'address': self.address_hex,
                 'detected': self.detected,
                 'initialized': True,
                 'frequency': self.frequency,
@@ -202,7 +294,7 @@ class FMTransmitterRDA5807(ControllerDevice):
             print(f"[FM] Status read error: {e}")
             return {
                 'name': self.name,
-                'address': hex(self.address),
+                'address': self.address_hex,
                 'detected': self.detected,
                 'initialized': True,
                 'frequency': self.frequency,
@@ -221,6 +313,7 @@ class ControllerDriver:
         self.hardware = hardware
         self.controllers = {}
         self.i2c_buses = {}
+        self.fm = None  # Direct reference to the FM transmitter, if present
         
         self._initialize_i2c_buses()
         self._discover_controllers()
@@ -228,6 +321,7 @@ class ControllerDriver:
     def _initialize_i2c_buses(self):
         """Initialize I2C buses based on configuration"""
         i2c_config = self.config.get("i2c_buses", {})
+        pins = self.hardware["pins"]
         
         for bus_name, bus_config in i2c_config.items():
             if not bus_config.get("enabled", False):
@@ -238,8 +332,8 @@ class ControllerDriver:
                 pins_config = bus_config.get("pins", {})
                 
                 if "sda" in pins_config and "scl" in pins_config:
-                    sda_pin = self.hardware["pins"][pins_config["sda"]]
-                    scl_pin = self.hardware["pins"][pins_config["scl"]]
+                    sda_pin = pins[pins_config["sda"]]
+                    scl_pin = pins[pins_config["scl"]]
                     freq = bus_config.get("frequency", 50000)
                     
                     self.i2c_buses[bus_num] = I2C(
@@ -261,7 +355,8 @@ class ControllerDriver:
         
         # FM Transmitter
         fm_config = controllers_config.get("fm_transmitter", {})
-        print(f"[CONTROLLER] FM config: {fm_config}")
+        if _DEBUG:
+            print(f"[CONTROLLER] FM config: {fm_config}")
         
         if fm_config.get("enabled", True):
             bus_num = 1  # FM Transmitter is always on I2C1 (controllers bus)
@@ -269,14 +364,17 @@ class ControllerDriver:
             default_freq = fm_config.get("default_frequency", 100.5)
             default_volume = fm_config.get("default_volume", 7)
             
-            print(f"[CONTROLLER] Looking for FM Transmitter on I2C{bus_num} at {hex(address)}")
+            if _DEBUG:
+                print(f"[CONTROLLER] Looking for FM Transmitter on I2C{bus_num} at {hex(address)}")
             
             if bus_num in self.i2c_buses:
-                print(f"[CONTROLLER] I2C{bus_num} available, scanning...")
+                if _DEBUG:
+                    print(f"[CONTROLLER] I2C{bus_num} available, scanning...")
                 fm = FMTransmitterRDA5807(self.i2c_buses[bus_num], address)
                 fm.detected = fm.detect()
                 
-                print(f"[CONTROLLER] FM Transmitter detected: {fm.detected}")
+                if _DEBUG:
+                    print(f"[CONTROLLER] FM Transmitter detected: {fm.detected}")
                 
                 if fm.detected:
                     if fm.initialize():
@@ -284,6 +382,7 @@ class ControllerDriver:
                         fm.set_frequency(default_freq)
                         fm.set_volume(default_volume)
                         self.controllers["fm_transmitter"] = fm
+                        self.fm = fm
                         print(f"[CONTROLLER] FM Transmitter initialized successfully")
                     else:
                         print(f"[CONTROLLER] FM Transmitter detected but failed to initialize")
@@ -298,24 +397,21 @@ class ControllerDriver:
     
     def set_frequency(self, freq_mhz):
         """Set frequency for FM transmitter"""
-        fm = self.controllers.get("fm_transmitter")
-        if fm and isinstance(fm, FMTransmitterRDA5807):
-            return fm.set_frequency(freq_mhz)
-        return False
+        if self.fm is None:
+            return False
+        return self.fm.set_frequency(freq_mhz)
     
     def set_volume(self, volume):
         """Set volume for FM transmitter"""
-        fm = self.controllers.get("fm_transmitter")
-        if fm and isinstance(fm, FMTransmitterRDA5807):
-            return fm.set_volume(volume)
-        return False
+        if self.fm is None:
+            return False
+        return self.fm.set_volume(volume)
     
     def set_mute(self, muted):
         """Mute/unmute FM transmitter"""
-        fm = self.controllers.get("fm_transmitter")
-        if fm and isinstance(fm, FMTransmitterRDA5807):
-            return fm.set_mute(muted)
-        return False
+        if self.fm is None:
+            return False
+        return self.fm.set_mute(muted)
     
     def get_all_status(self):
         """Get status of all controllers"""
@@ -353,10 +449,12 @@ class ControllerDriver:
     
     def get_controller_data(self):
         """Get data from all controllers for display"""
-        data = {}
-        
-        fm = self.controllers.get("fm_transmitter")
-        if fm and isinstance(fm, FMTransmitterRDA5807):
+        return self.get_controller_data_into({})
+    
+    def get_controller_data_into(self, data):
+        """Write controller data for display into data, in place"""
+        fm = self.fm
+        if fm is not None:
             status = fm.get_status()
             data['fm_frequency'] = status.get('frequency', 100.5)
             data['fm_volume'] = status.get('volume', 7)
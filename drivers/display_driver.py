@@ -72,6 +72,8 @@ class DisplayDriver:
         self.display_type = None
         self.detected = False
         self.initialized = False
+        self._show = None  # Type-specific frame sender, bound at init
+        self._show_region = None  # Type-specific window sender, None when only full frames work
         
         self._initialize_display()
         print(f"[DISPLAY] Display driver initialized for {self.display_type}")
@@ -81,6 +83,12 @@ class DisplayDriver:
         display_config = self.config.get("display", {})
         self.display_type = display_config.get("type", "st7567_spi")
         
+        # Resolve geometry once; zeroed frame reused for every clear
+        self._w = display_config.get("width", 128)
+        self._h = display_config.get("height", 64)
+        self._fb_bytes = self._w * self._h // 8
+        self._blank = bytearray(self._fb_bytes)
+        
         print(f"[DISPLAY] Initializing {self.display_type}")
         
         try:
@@ -89,11 +97,16 @@ class DisplayDriver:
                     print("[DISPLAY] Error: SSD1306 library not available")
                     return
                 self._init_ssd1306(display_config)
+                self._show = self._show_ssd1306
+                # Window writes need the raw command/data calls and the 128-column layout
+                if self._w == 128 and hasattr(self.display, 'write_cmd'):
+                    self._show_region = self._show_region_ssd1306
             elif self.display_type == "st7567_spi":
                 if not ST7567_AVAILABLE:
                     print("[DISPLAY] Error: ST7567 library not available")
                     return
                 self._init_st7567(display_config)
+                self._show = self._show_st7567
             else:
                 print(f"[DISPLAY] Unsupported: {self.display_type}")
                 return
@@ -114,42 +127,80 @@ class DisplayDriver:
             return False
         
         try:
-            if self.display_type == "ssd1306_i2c":
-                # SSD1306 uses display.fill() and display.show() directly
-                if isinstance(framebuffer, (bytes, bytearray)):
-                    # Raw buffer received - copy to SSD1306
-                    if hasattr(self.display, 'buffer'):
-                        for i in range(min(len(framebuffer), len(self.display.buffer))):
-                            self.display.buffer[i] = framebuffer[i]
-                    self.display.show()
-                else:
-                    # FrameBuffer object received
-                    self.display.fill(0)
-                    if hasattr(self.display, 'blit'):
-                        self.display.blit(framebuffer, 0, 0)
-                    else:
-                        # Fallback: assume it has internal buffer
-                        if hasattr(framebuffer, 'buffer'):
-                            for i in range(len(framebuffer.buffer)):
-                                self.display.buffer[i] = framebuffer.buffer[i]
-                    self.display.show()
-                    
-            elif self.display_type == "st7567_spi":
-                # ST7567 receives raw framebuffer buffer (bytes/bytearray)
-                if not isinstance(framebuffer, (bytes, bytearray)):
-                    print(f"[DISPLAY] ST7567: Invalid buffer type: {type(framebuffer)}, expected bytes/bytearray")
-                    return False
-                
-                # Framebuffer sent to hardware
-                # Send to ST7567 hardware
-                self.display.show(framebuffer)
-            
-            return True
-            
+            return self._show(framebuffer)
         except Exception as e:
             print(f"[DISPLAY] Show framebuffer error: {e}")
             return False
     
+    def show_region(self, framebuffer, x, y, w, h):
+        """
+        Send only a window of the framebuffer (y and h multiples of 8)
+        Falls back to the full frame where the display can't address a window
+        """
+        if not self._show_region:
+            return self.show_framebuffer(framebuffer)
+        if not self.is_healthy():
+            return False
+        
+        try:
+            return self._show_region(framebuffer, x, y, w, h)
+        except Exception as e:
+            print(f"[DISPLAY] Show region error: {e}")
+            return False
+    
+    def _show_region_ssd1306(self, framebuffer, x, y, w, h):
+        """Send a window to SSD1306 using column/page addressing (bound to _show_region at init)"""
+        first_page = y >> 3
+        last_page = (y + h - 1) >> 3
+        display = self.display
+        for cmd in (0x21, x, x + w - 1, 0x22, first_page, last_page):
+            display.write_cmd(cmd)
+        
+        # Horizontal addressing wraps inside the window, so the rows go out back to back
+        src = memoryview(framebuffer)
+        dst = memoryview(display.buffer)
+        for page in range(first_page, last_page + 1):
+            start = page * self._w + x
+            dst[start:start + w] = src[start:start + w]  # Keep the driver's buffer in step
+            display.write_data(src[start:start + w])
+        return True
+    
+    def _show_ssd1306(self, framebuffer):
+        """Send framebuffer to SSD1306 (bound to _show at init)"""
+        # SSD1306 uses display.fill() and display.show() directly
+        if isinstance(framebuffer, (bytes, bytearray)):
+            # Raw buffer received - copy to SSD1306
+            if hasattr(self.display, 'buffer'):
+                dst = memoryview(self.display.buffer)
+                src = memoryview(framebuffer)
+                n = min(len(src), len(dst))
+                dst[:n] = src[:n]
+            self.display.show()
+        else:
+            # FrameBuffer object received (full-screen, blit overwrites everything)
+            if hasattr(self.display, 'blit'):
+                self.display.blit(framebuffer, 0, 0)
+            else:
+                # Fallback: assume it has internal buffer
+                if hasattr(framebuffer, 'buffer'):
+                    dst = memoryview(self.display.buffer)
+                    src = memoryview(framebuffer.buffer)
+                    n = min(len(src), len(dst))
+                    dst[:n] = src[:n]
+            self.display.show()
+        return True
+    
+    def _show_st7567(self, framebuffer):
+        """Send framebuffer to ST7567 (bound to _show at init)"""
+        # ST7567 receives raw framebuffer buffer (bytes/bytearray)
+        if not isinstance(framebuffer, (bytes, bytearray)):
+            print(f"[DISPLAY] ST7567: Invalid buffer type: {type(framebuffer)}, expected bytes/bytearray")
+            return False
+        
+        # Send to ST7567 hardware without copying the frame
+        self.display.show(memoryview(framebuffer))
+        return True
+    
     def clear_display(self):
         """Clear the display"""
         if not self.is_healthy():
@@ -160,9 +211,7 @@ class DisplayDriver:
                 self.display.fill(0)
                 self.display.show()
             elif self.display_type == "st7567_spi":
-                empty_buffer = bytearray(self.config.get("display", {}).get("width", 128) * 
-                                      self.config.get("display", {}).get("height", 64) // 8)
-                self.display.show(empty_buffer)
+                self.display.show(self._blank)
             return True
         except Exception as e:
             print(f"[DISPLAY] Clear error: {e}")
@@ -185,15 +234,16 @@ class DisplayDriver:
         sda_pin_name = pins_config.get("sda", "i2c0_sda")
         scl_pin_name = pins_config.get("scl", "i2c0_scl")
         
-        if sda_pin_name not in self.hardware["pins"]:
+        pins = self.hardware["pins"]
+        if sda_pin_name not in pins:
             print(f"[DISPLAY] Pin {sda_pin_name} not found in hardware config")
             return
-        if scl_pin_name not in self.hardware["pins"]:
+        if scl_pin_name not in pins:
             print(f"[DISPLAY] Pin {scl_pin_name} not found in hardware config")
             return
             
-        sda_pin = self.hardware["pins"][sda_pin_name]
-        scl_pin = self.hardware["pins"][scl_pin_name]
+        sda_pin = pins[sda_pin_name]
+        scl_pin = pins[scl_pin_name]
         freq = i2c_config.get("frequency", 400000)
         
         print(f"[DISPLAY] Initializing I2C on bus {i2c_bus_config}, SDA={sda_pin}, SCL={scl_pin}")
@@ -217,7 +267,7 @@ class DisplayDriver:
                 print(f"[DISPLAY] Device at 0x{i2c_address:02X} also not found")
                 return
         
-        self.display = SSD1306_I2C(128, 64, i2c_bus, addr=i2c_address)
+        self.display = SSD1306_I2C(self._w, self._h, i2c_bus, addr=i2c_address)
         
         # Test
         self.display.fill(0)
@@ -243,18 +293,19 @@ class DisplayDriver:
         rst_pin_name = pins_config.get("rst", "spi1_rst")
         
         # Get actual pin numbers
-        sck_pin = self.hardware["pins"].get(sck_pin_name, 14)
-        mosi_pin = self.hardware["pins"].get(mosi_pin_name, 15)
-        dc_pin = self.hardware["pins"].get(dc_pin_name, 12)
-        cs_pin = self.hardware["pins"].get(cs_pin_name, 13)
-        rst_pin = self.hardware["pins"].get(rst_pin_name, 11)
+        pins = self.hardware["pins"]
+        sck_pin = pins.get(sck_pin_name, 14)
+        mosi_pin = pins.get(mosi_pin_name, 15)
+        dc_pin = pins.get(dc_pin_name, 12)
+        cs_pin = pins.get(cs_pin_name, 13)
+        rst_pin = pins.get(rst_pin_name, 11)
         
         print(f"[DISPLAY] Initializing ST7567 on SPI bus {spi_bus_config}")
         print(f"[DISPLAY] Pins: SCK={sck_pin}, MOSI={mosi_pin}, DC={dc_pin}, CS={cs_pin}, RST={rst_pin}")
         
         spi_bus = SPI(
             spi_bus_config,
-            baudrate=config.get("spi_settings", {}).get("baudrate", 200000),
+            baudrate=config.get("spi_settings", {}).get("baudrate", 8000000),
             polarity=config.get("spi_settings", {}).get("polarity", 1),
             phase=config.get("spi_settings", {}).get("phase", 1),
             sck=Pin(sck_pin),
@@ -278,8 +329,8 @@ class DisplayDriver:
         
         # Test using frame buffer
         if FrameBuffer:
-            buffer = bytearray(128 * 64 // 8)
-            fb = FrameBuffer(buffer, 128, 64, MONO_VLSB)
+            buffer = bytearray(self._fb_bytes)
+            fb = FrameBuffer(buffer, self._w, self._h, MONO_VLSB)
             fb.fill(0)
             fb.text("ST7567 OK", 0, 0)
             fb.text("128x64 LCD", 0, 10)
@@ -307,17 +358,17 @@ class DisplayDriver:
         if self.is_healthy():
             if self.display_type == "st7567_spi":
                 status.update({
-                    'resolution': '128x64',
+                    'resolution': f'{self._w}x{self._h}',
                     'library': 'ST7567',
-                    'width': 128,
-                    'height': 64,
+                    'width': self._w,
+                    'height': self._h,
                 })
             elif self.display_type == "ssd1306_i2c":
                 status.update({
-                    'resolution': '128x64', 
+                    'resolution': f'{self._w}x{self._h}', 
                     'library': 'SSD1306',
-                    'width': 128,
-                    'height': 64,
+                    'width': self._w,
+                    'height': self._h,
                 })
         
         return status
@@ -330,11 +381,7 @@ class DisplayDriver:
                     self.display.fill(0)
                     self.display.show()
                 elif self.display_type == "st7567_spi":
-                    if FrameBuffer:
-                        buffer = bytearray(128 * 64 // 8)
-                        fb = FrameBuffer(buffer, 128, 64, MONO_VLSB)
-                        fb.fill(0)
-                        self.display.show(buffer)
+                    self.display.show(self._blank)
             except Exception as e:
                 print(f"[DISPLAY] Clear error: {e}")
                 print_exception(e)
@@ -356,15 +403,14 @@ class DisplayDriver:
                 self.display.show()
             elif self.display_type == "st7567_spi":
                 if FrameBuffer:
-                    buffer = bytearray(128 * 64 // 8)
-                    fb = FrameBuffer(buffer, 128, 64, MONO_VLSB)
+                    buffer = bytearray(self._fb_bytes)
+                    fb = FrameBuffer(buffer, self._w, self._h, MONO_VLSB)
                     fb.fill(0)
                     fb.text("TEST OK", 30, 25)
                     fb.text(self.display_type, 20, 35)
                     self.display.show(buffer)
                     time.sleep(2)
-                    fb.fill(0)
-                    self.display.show(buffer)
+                    self.display.show(self._blank)
             
             return True
         except Exception as e:
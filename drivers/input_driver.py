@@ -5,15 +5,132 @@ Handles all button inputs with debouncing and callback system
 
 import time
 import utime
+import array
+import micropython
 
 from machine import Pin
+from micropython import const
+
+try:
+    import heapq
+except ImportError:
+    import uheapq as heapq
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    asyncio = None
+
+# Folded by the compiler: with _DEBUG off the info prints are dead code.
+# Errors stay visible through _VERBOSE_ERRORS
+_DEBUG = const(0)
+_VERBOSE_ERRORS = const(1)
+
+# Shared result for scans with no events (avoids a list allocation)
+_EMPTY = ()
+
+# RP2040 SIO GPIO_IN register - all bank 0 pin levels in one word
+_SIO_GPIO_IN = const(0xD0000004)
+
+
+@micropython.viper
+def _read_gpio_bank(mask: int) -> int:
+    """Read all GPIO levels with a single load, masked to button pins"""
+    gpio_in = ptr32(_SIO_GPIO_IN)
+    return gpio_in[0] & mask
+
+
+class ButtonBank:
+    """Press state for a group of buttons, stored as parallel arrays by slot"""
+    
+    def __init__(self, size):
+        self.last_state = bytearray(size)
+        self.pressed_time = array.array('i', [0] * size)
+        self.long_pressed = bytearray(size)
+        self.press_count = array.array('I', [0] * size)
+        self.last_edge = array.array('i', [0] * size)  # ticks_ms of the last accepted edge
+        # Min-heap of (long press deadline, slot); stale entries are skipped
+        self.longpress = []
+
+
+def _make_check(button, pressed_level):
+    """Build check() for one button with its polarity and bank slot bound"""
+    bank = button._bank
+    i = button._slot
+    last_state = bank.last_state
+    pressed_time = bank.pressed_time
+    long_pressed = bank.long_pressed
+    last_edge = bank.last_edge
+    longpress = bank.longpress
+    ticks_ms = utime.ticks_ms
+    ticks_diff = utime.ticks_diff
+    ticks_add = utime.ticks_add
+    
+    @micropython.native
+    def check():
+        was_pressed = (last_state[i] == pressed_level)
+        
+        if button._pending:
+            # Edge reported by IRQ or bank scan. Edges inside the holdoff
+            # window are bounce; keep the latest one pending until it ends.
+            # Elapsed time since the accepted edge, so a long idle gap can't
+            # read as a future deadline (a wrapped, negative diff is expired)
+            if 0 <= ticks_diff(ticks_ms(), last_edge[i]) < button.debounce_ms:
+                return ""
+            button._pending = False
+            current_state = button._edge_val
+            current_time = button._edge_ts
+            last_edge[i] = current_time
+        elif was_pressed:
+            # Held - only long press expiry to check
+            current_state = pressed_level
+            current_time = ticks_ms()
+        else:
+            # Idle, nothing happened since last check
+            return ""
+        
+        is_pressed = (current_state == pressed_level)
+        
+        last_state[i] = current_state
+        
+        # Button just pressed
+        if is_pressed and not was_pressed:
+            pressed_time[i] = current_time
+            long_pressed[i] = 0
+            heapq.heappush(longpress, (ticks_add(current_time, button.long_press_ms), i))
+            
+        # Button just released
+        elif not is_pressed and was_pressed:
+            if not long_pressed[i]:
+                # Normal press
+                button._invoke(button.callback)
+                bank.press_count[i] += 1
+                return button._press_event
+        
+        # Check for long press while pressed
+        elif is_pressed and was_pressed:
+            press_duration = ticks_diff(current_time, pressed_time[i])
+            
+            if (press_duration >= button.long_press_ms and not long_pressed[i]):
+                long_pressed[i] = 1
+                button._invoke(button.long_callback)
+                return button._long_event
+        
+        return ""
+    
+    return check
 
 
 class Button:
     """Individual button with debouncing and callback support"""
     
-    def __init__(self, name, pin_num, pull_up = True):
+    ERROR_PREFIX = "[INPUT] Button "
+    
+    def __init__(self, name, pin_num, pull_up = True, bank = None, slot = 0):
         self.name = name
+        # Event strings built once, returned by reference from check()
+        self._press_event = name + "_press"
+        self._long_event = name + "_long"
         self.pin_num = pin_num
         self.pull_up = pull_up
         self.pin = None
@@ -24,15 +141,31 @@ class Button:
         self.debounce_ms = 50
         self.long_press_ms = 2000
         
-        # State tracking
-        self.last_state = 0
+        # State tracking lives in a shared ButtonBank slot
+        self._bank = bank if bank is not None else ButtonBank(1)
+        self._slot = slot
         self.last_press_time = 0
-        self.pressed_time = 0
-        self.long_pressed = False
-        self.press_count = 0
         
         self.detected = False
         self.error_count = 0
+        
+        # Edge captured by the pin IRQ (preallocated, no allocation in ISR)
+        self._pending = False
+        self._edge_ts = 0
+        self._edge_val = 0
+        self._flag = None  # Optional ThreadSafeFlag set on every edge
+        
+        # Fixed-shape status dict, refreshed in place by get_status()
+        self._status = {
+            'name': name,
+            'pin': pin_num,
+            'detected': False,
+            'pull_up': pull_up,
+            'current_state': 0,
+            'pressed': False,
+            'press_count': 0,
+            'error_count': 0
+        }
     
     def initialize(self):
         """Initialize button pin"""
@@ -42,16 +175,50 @@ class Button:
             else:
                 self.pin = Pin(self.pin_num, Pin.IN)
             
-            self.last_state = self.pin.value()
+            self._read = self.pin.value
+            self.last_state = self._read()
+            # Polarity never changes after init: bind a specialized check()
+            self.check = _make_check(self, 0 if self.pull_up else 1)
+            self.pin.irq(trigger=Pin.IRQ_FALLING | Pin.IRQ_RISING, handler=self._isr)
             self.detected = True
-            print(f"[INPUT] Button {self.name} initialized on pin {self.pin_num}")
+            if _DEBUG:
+                print(f"[INPUT] Button {self.name} initialized on pin {self.pin_num}")
             return True
             
         except Exception as e:
             self.error_count += 1
-            print(f"[INPUT] Button {self.name} init error: {e}")
+            if _VERBOSE_ERRORS:
+                print(f"[INPUT] Button {self.name} init error: {e}")
             return False
     
+    @property
+    def last_state(self):
+        return self._bank.last_state[self._slot]
+    
+    @last_state.setter
+    def last_state(self, value):
+        self._bank.last_state[self._slot] = value
+    
+    @property
+    def pressed_time(self):
+        return self._bank.pressed_time[self._slot]
+    
+    @property
+    def long_pressed(self):
+        return bool(self._bank.long_pressed[self._slot])
+    
+    @property
+    def press_count(self):
+        return self._bank.press_count[self._slot]
+    
+    def _isr(self, pin):
+        """Pin IRQ handler - timestamp the edge, processed later by check()"""
+        self._edge_ts = utime.ticks_ms()
+        self._edge_val = pin.value()
+        self._pending = True
+        if self._flag:
+            self._flag.set()
+    
     def set_callback(self, callback):
         """Set normal press callback"""
         self.callback = callback
@@ -61,82 +228,37 @@ class Button:
         self.long_callback = callback
     
     def check(self):
-        """Check button state and return event"""
-        if not self.detected or not self.pin:
-            return ""
-        
+        """Check button state and return event (replaced once initialized)"""
+        return ""
+    
+    def _invoke(self, callback):
+        """Run a user callback; its failures count against this button"""
+        if not callback:
+            return
         try:
-            current_state = self.pin.value()
-            current_time = utime.ticks_ms()
-            
-            # Handle pull-up logic (inverted)
-            if self.pull_up:
-                is_pressed = (current_state == 0)
-            else:
-                is_pressed = (current_state == 1)
-            
-            was_pressed = (self.last_state == 0) if self.pull_up else (self.last_state == 1)
-            
-            # Button just pressed
-            if is_pressed and not was_pressed:
-                self.pressed_time = current_time
-                self.long_pressed = False
-                
-            # Button just released
-            elif not is_pressed and was_pressed:
-                press_duration = utime.ticks_diff(current_time, self.pressed_time)
-                
-                if press_duration > self.debounce_ms:
-                    if not self.long_pressed:
-                        # Normal press
-                        if self.callback:
-                            self.callback()
-                        self.press_count += 1
-                        return f"{self.name}_press"
-            
-            # Check for long press while pressed
-            elif is_pressed and was_pressed:
-                press_duration = utime.ticks_diff(current_time, self.pressed_time)
-                
-                if (press_duration > self.long_press_ms and not self.long_pressed):
-                    self.long_pressed = True
-                    if self.long_callback:
-                        self.long_callback()
-                    return f"{self.name}_long"
-            
-            self.last_state = current_state
-            return ""
-            
+            callback()
         except Exception as e:
             self.error_count += 1
-            print(f"[INPUT] Button {self.name} check error: {e}")
-            return ""
+            if _VERBOSE_ERRORS:
+                print(self.ERROR_PREFIX + self.name + " callback error:", e)
     
     def get_status(self):
-        """Get button status"""
-        current_state = 0
-        if self.pin:
-            try:
-                current_state = self.pin.value()
-            except:
-                pass
-                
-        return {
-            'name': self.name,
-            'pin': self.pin_num,
-            'detected': self.detected,
-            'pull_up': self.pull_up,
-            'current_state': current_state,
-            'pressed': (current_state == 0) if self.pull_up else (current_state == 1),
-            'press_count': self.press_count,
-            'error_count': self.error_count
-        }
+        """Get button status (shared dict, copy it to keep a snapshot)"""
+        current_state = self._read() if self.detected else 0
+        
+        status = self._status
+        status['detected'] = self.detected
+        status['current_state'] = current_state
+        status['pressed'] = (current_state == 0) if self.pull_up else (current_state == 1)
+        status['press_count'] = self.press_count
+        status['error_count'] = self.error_count
+        return status
     
     def simulate_press(self):
         """Simulate button press (for testing)"""
         if self.callback:
             self.callback()
-        self.press_count += 1
+        self._bank.press_count[self._slot] += 1
     
     def simulate_long_press(self):
         """Simulate long button press (for testing)"""
@@ -145,7 +267,7 @@ class Button:
     
     def reset_press_count(self):
         """Reset press counter"""
-        self.press_count = 0
+        self._bank.press_count[self._slot] = 0
 
 
 class InputDriver:
@@ -155,11 +277,27 @@ class InputDriver:
         self.config = config
         self.hardware = hardware
         self.buttons = {}
+        self._button_tuple = ()  # Fixed after init, iterated instead of the dict
+        self._slot_bits = ()  # Pin bit per bank slot
         self.callbacks = {}
         self.enabled = False
-        self.last_check = 0
+        self._next_check = 0
         self.check_interval = 20  # Check every 20ms
         
+        self._bank = None
+        
+        # Banked GPIO scan state
+        self._pin_mask = 0
+        self._pin_lut = {}  # pin bit -> Button
+        self._pullup_mask = 0  # Pins that read 0 when pressed
+        self._state_word = 0  # 1 = pressed, polarity already normalized
+        self._settling = 0  # Buttons holding an edge deferred by debounce
+        
+        self._all_status = {}  # Reused by get_all_status()
+        
+        # Set from the pin IRQs so async consumers can sleep between edges
+        self._event = asyncio.ThreadSafeFlag() if asyncio else None
+        
         self._initialize_buttons()
     
     def _initialize_buttons(self):
@@ -167,78 +305,173 @@ class InputDriver:
         buttons_config = self.config.get("buttons", {})
         
         if not buttons_config.get("enabled", True):
-            print("[INPUT] Buttons disabled in config")
+            if _DEBUG:
+                print("[INPUT] Buttons disabled in config")
             return
         
         debounce_ms = buttons_config.get("debounce_ms", 50)
         long_press_ms = buttons_config.get("long_press_ms", 2000)
         pins_config = buttons_config.get("pins", {})
         
+        # Shared per-button state, one slot per configured button
+        self._bank = ButtonBank(len(pins_config))
+        slot = 0
+        
         for button_name, pin_name in pins_config.items():
             if pin_name not in self.hardware["pins"]:
-                print(f"[INPUT] Pin {pin_name} not found in hardware config")
+                if _VERBOSE_ERRORS:
+                    print(f"[INPUT] Pin {pin_name} not found in hardware config")
                 continue
             
             pin_num = self.hardware["pins"][pin_name]
             
-            button = Button(button_name, pin_num, pull_up=True)
+            button = Button(button_name, pin_num, pull_up=True, bank=self._bank, slot=slot)
             button.debounce_ms = debounce_ms
             button.long_press_ms = long_press_ms
             
+            button._flag = self._event
             if button.initialize():
                 self.buttons[button_name] = button
+                bit = 1 << pin_num
+                self._pin_mask |= bit
+                if button.pull_up:
+                    self._pullup_mask |= bit
+                self._pin_lut[bit] = button
+                slot += 1
             else:
-                print(f"[INPUT] Failed to initialize button {button_name}")
+                if _VERBOSE_ERRORS:
+                    print(f"[INPUT] Failed to initialize button {button_name}")
+        
+        self._state_word = _read_gpio_bank(self._pin_mask) ^ self._pullup_mask
+        self._button_tuple = tuple(self.buttons.values())
+        self._slot_bits = tuple(1 << b.pin_num for b in self._button_tuple)
         
         if self.buttons:
             self.enabled = True
-            print(f"[INPUT] {len(self.buttons)} buttons initialized")
+            if _DEBUG:
+                print(f"[INPUT] {len(self.buttons)} buttons initialized")
         else:
-            print("[INPUT] No buttons configured")
+            if _DEBUG:
+                print("[INPUT] No buttons configured")
     
+    @micropython.native
     def check_all(self):
         """Check all buttons and return list of events"""
-        events = []
         current_time = utime.ticks_ms()
         
-        # Rate limiting
-        if utime.ticks_diff(current_time, self.last_check) < self.check_interval:
-            return events
+        # Rate limiting against an absolute deadline
+        if utime.ticks_diff(current_time, self._next_check) < 0:
+            return _EMPTY
         
         if not self.enabled:
-            return events
+            return _EMPTY
+        
+        self._next_check = utime.ticks_add(current_time, self.check_interval)
+        
+        # One load captures every button; normalize polarity so 1 = pressed
+        raw = _read_gpio_bank(self._pin_mask)
+        pressed = raw ^ self._pullup_mask
+        prev = self._state_word
+        rising = pressed & ~prev
+        falling = prev & ~pressed
+        changed = rising | falling
+        
+        # Held buttons whose long-press deadline passed. Entries left by a
+        # released button just see a short press duration and do nothing
+        heap = self._bank.longpress
+        due = 0
+        while heap and utime.ticks_diff(current_time, heap[0][0]) >= 0:
+            due |= self._slot_bits[heapq.heappop(heap)[1]]
+        
+        # Nothing moved and no long press is due - skip per-button work
+        if not (changed or due or self._settling):
+            return _EMPTY
+        
+        self._state_word = pressed
+        events = []
+        
+        # Hand edges to their Button unless the pin IRQ already reported the
+        # same level (its timestamp is more precise)
+        edges = changed
+        while edges:
+            bit = edges & -edges
+            edges ^= bit
+            button = self._pin_lut[bit]
+            level = 1 if raw & bit else 0
+            if not (button._pending and button._edge_val == level):
+                button._edge_val = level
+                button._edge_ts = current_time
+                button._pending = True
         
-        for button in self.buttons.values():
+        # Only changed, long-press due and settling buttons need a check
+        active = changed | due | self._settling
+        settling = 0
+        while active:
+            bit = active & -active
+            active ^= bit
+            button = self._pin_lut[bit]
             event = button.check()
             if event:
                 events.append(event)
+            if button._pending:
+                settling |= bit
+        self._settling = settling
         
-        self.last_check = current_time
         return events
     
+    async def wait_events(self):
+        """Wait for button activity and return the resulting events
+        
+        Sleeps on the IRQ flag, waking early only for the next long-press
+        deadline or to settle an edge deferred by debounce.
+        """
+        heap = self._bank.longpress if self._bank else []
+        while True:
+            if self._settling:
+                timeout = self.check_interval
+            elif heap:
+                timeout = max(0, utime.ticks_diff(heap[0][0], utime.ticks_ms()))
+            else:
+                timeout = -1
+            
+            if timeout < 0:
+                await self._event.wait()
+            else:
+                try:
+                    await asyncio.wait_for_ms(self._event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            
+            self._next_check = utime.ticks_ms()  # Edge pending - bypass the rate limit (0 would wrap after ~6 days)
+            events = self.check_all()
+            if events:
+                return events
+    
     def register_callback(self, button_name, callback):
         """Register callback for button press"""
         if button_name in self.buttons:
             self.buttons[button_name].set_callback(callback)
             self.callbacks[f"{button_name}_press"] = callback
-            print(f"[INPUT] Callback registered for {button_name}")
+            if _DEBUG:
+                print(f"[INPUT] Callback registered for {button_name}")
     
     def register_long_callback(self, button_name, callback):
         """Register callback for button long press"""
         if button_name in self.buttons:
             self.buttons[button_name].set_long_callback(callback)
             self.callbacks[f"{button_name}_long"] = callback
-            print(f"[INPUT] Long callback registered for {button_name}")
+            if _DEBUG:
+                print(f"[INPUT] Long callback registered for {button_name}")
     
     def get_button(self, name):
         """Get button by name"""
         return self.buttons.get(name)
     
     def get_all_status(self):
-        """Get status of all buttons"""
-        status = {}
-        for name, button in self.buttons.items():
-            status[name] = button.get_status()
+        """Get status of all buttons (shared dict, refreshed in place)"""
+        status = self._all_status
+        for button in self._button_tuple:
+            status[button.name] = button.get_status()
         return status
     
     def simulate_press(self, button_name):
@@ -253,7 +486,7 @@ class InputDriver:
     
     def reset_all_press_counts(self):
         """Reset press counters for all buttons"""
-        for button in self.buttons.values():
+        for button in self._button_tuple:
             button.reset_press_count()
     
     def is_enabled(self):
@@ -270,20 +503,22 @@ class InputDriver:
             return True  # Disabled is OK
             
         # Check if at least one button is working
-        working_buttons = sum(1 for b in self.buttons.values() 
-                             if b.detected and b.error_count < 10)
-        
-        return working_buttons > 0
+        for b in self._button_tuple:
+            if b.detected and b.error_count < 10:
+                return True
+        return False
     
     def enable(self):
         """Enable input checking"""
         self.enabled = True
-        print("[INPUT] Input driver enabled")
+        if _DEBUG:
+            print("[INPUT] Input driver enabled")
     
     def disable(self):
         """Disable input checking"""
         self.enabled = False
-        print("[INPUT] Input driver disabled")
+        if _DEBUG:
+            print("[INPUT] Input driver disabled")
     
     def set_check_interval(self, interval_ms):
         """Set button check interval"""
@@ -3,9 +3,150 @@ Networking Driver - Unified WiFi management for PicoWeather
 Handles both Pico W native WiFi and external ESP8285 via UART
 """
 
+import json
+import os
 import time
 import utime
-from machine import UART, Pin
+from machine import UART, Pin, idle
+
+try:
+    import uselect as select
+except ImportError:
+    import select
+
+try:
+    import uasyncio as asyncio
+except ImportError:
+    asyncio = None
+
+try:
+    import urandom as random
+except ImportError:
+    import random
+
+from binascii import hexlify, unhexlify
+
+# Fixed AT commands, pre-terminated so they go to the UART without
+# concatenation or encoding
+_AT = b"AT\r\n"
+_AT_ECHO_OFF = b"ATE0\r\n"
+_AT_CWMODE_STA = b"AT+CWMODE=1\r\n"
+_AT_CIPMUX_SINGLE = b"AT+CIPMUX=0\r\n"
+_AT_CWLAP = b"AT+CWLAP\r\n"
+_AT_CWJAP_Q = b"AT+CWJAP?\r\n"
+_AT_CWQAP = b"AT+CWQAP\r\n"
+_AT_CIFSR = b"AT+CIFSR\r\n"
+_AT_CIPSNTPTIME_Q = b"AT+CIPSNTPTIME?\r\n"
+_AT_CIPSNTPCFG_DEFAULT = b'AT+CIPSNTPCFG=1,0,"pool.ntp.org"\r\n'
+_AT_UART_CUR_DEFAULT = b"AT+UART_CUR=115200,8,1,0,0\r\n"
+
+# Queries that leave the link state alone and keep the connection lease valid
+_AT_STATUS_QUERIES = (_AT, _AT_CWJAP_Q, _AT_CIFSR, _AT_CIPSNTPTIME_Q)
+
+# 0 = silent, 1 = info, 2 = debug; every print blocks on the UART/USB
+LOG_LEVEL = 1
+_LOG_DEBUG = 2
+
+# Last network joined (ssid, bssid, channel), tried first on the next boot
+_WIFI_CACHE_FILE = "/wifi_cache.json"
+
+
+# BSSID as aa:bb:cc:dd:ee:ff - one C call where hexlify takes a separator
+try:
+    hexlify(b"\x00\x00", ":")
+    
+    def _format_bssid(bssid):
+        return hexlify(bssid, ":").decode()
+except (TypeError, ValueError):
+    def _format_bssid(bssid):
+        return ':'.join(['{:02x}'.format(b) for b in bssid])
+
+
+def _dbg(msg):
+    """Print a progress trace, only at debug level"""
+    if LOG_LEVEL < _LOG_DEBUG:
+        return
+    print(msg)
+
+
+def _priority(network_config):
+    """Sort key for configured networks, lowest priority value first"""
+    return network_config.get('priority', 999)
+
+
+def _iter_lines(buf):
+    """Yield the lines of an AT response one at a time instead of splitting it all"""
+    nl = "\n" if isinstance(buf, str) else b"\n"
+    i = 0
+    n = len(buf)
+    while i < n:
+        j = buf.find(nl, i)
+        if j < 0:
+            j = n
+        yield buf[i:j]
+        i = j + 1
+
+
+def _configured_ssids(config):
+    """SSIDs from wifi.networks as bytes, the form scans report them in"""
+    return {n['ssid'].encode() for n in config.get("wifi", {}).get("networks", []) if n.get('ssid')}
+
+
+def _parse_at_response(resp):
+    """Index an AT reply in one pass: (final status, {b'CWJAP': b'"ssid",...'})"""
+    status = None
+    fields = {}
+    for line in _iter_lines(resp):
+        line = line.strip()
+        if line.startswith(b"+"):
+            c = line.find(b":")
+            if c > 0:
+                key = line[1:c]
+                # First one wins, e.g. +CIFSR:STAIP before +CIFSR:STAMAC
+                if key not in fields:
+                    fields[key] = line[c + 1:].strip()
+        elif line in (b"OK", b"ERROR", b"FAIL"):
+            status = line
+    return status, fields
+
+
+def _quoted_ssid(field):
+    """SSID from a '"ssid",...' response field, None when absent"""
+    if not field or field[0] != 0x22:  # '"'
+        return None
+    # SSID may contain commas, so it ends at the quote-comma
+    j = field.find(b'",', 1)
+    if j < 0:
+        j = field.rfind(b'"')
+        if j < 1:
+            return None
+    return field[1:j].decode()
+
+
+def _int_or(field, default):
+    """Parse an AT response field, falling back to default"""
+    try:
+        return int(field)
+    except ValueError:
+        return default
+
+
+_SNTP_MONTHS = (b"Jan", b"Feb", b"Mar", b"Apr", b"May", b"Jun",
+                b"Jul", b"Aug", b"Sep", b"Oct", b"Nov", b"Dec")
+
+
+def _parse_sntp_time(field):
+    """Seconds since the epoch for a +CIPSNTPTIME field, None if unset or malformed"""
+    try:
+        _, month, day, clock, year = field.split()
+        year = int(year)
+        if year < 2021:  # Module not synchronized yet (reports 1970)
+            return None
+        hour, minute, second = clock.split(b":")
+        return utime.mktime((year, _SNTP_MONTHS.index(month) + 1, int(day),
+                             int(hour), int(minute), int(second), 0, 0))
+    except ValueError:
+        return None
 
 
 class PicoWWifiManager:
@@ -20,6 +161,15 @@ class PicoWWifiManager:
         self.error_count = 0
         self.last_scan = []
         self.initialized = False
+        self.auth_failed = False  # Every network in the last pass refused the password
+        self._auth_refused = False
+        self._configured = _configured_ssids(config)  # Scans keep only these unless forced
+        
+        # Resolved NTP server address, reused until the TTL expires
+        self._ntp_host = None
+        self._ntp_ip = None
+        self._ntp_ip_ts = 0
+        self._ntp_ttl_ms = 24 * 3600 * 1000
         
     def initialize(self):
         """Initialize Pico W WiFi"""
@@ -34,41 +184,49 @@ class PicoWWifiManager:
             print(f"[WIFI] Pico W initialization failed: {e}")
             return False
     
-    def scan_networks(self):
-        """Scan for WiFi networks"""
+    def scan_networks(self, force_full_scan=False):
+        """Scan for WiFi networks, only configured ones unless force_full_scan"""
         if not self.initialized:
             return []
         
         try:
-            networks = self.network.scan()
-            formatted_networks = []
-            
-            for ssid, bssid, channel, rssi, authmode, hidden in networks:
-                ssid_str = ssid.decode('utf-8') if isinstance(ssid, bytes) else str(ssid)
-                formatted_networks.append({
-                    'ssid': ssid_str,
-                    'bssid': ':'.join(['{:02x}'.format(b) for b in bssid]),
-                    'channel': channel,
-                    'rssi': rssi,
-                    'authmode': authmode,
-                    'hidden': hidden
-                })
-            
-            self.last_scan = formatted_networks
-            return formatted_networks
+            self.last_scan = self._format_scan(self.network.scan(), force_full_scan)
+            return self.last_scan
             
         except Exception as e:
             print(f"[WIFI] Scan error: {e}")
             return []
     
+    def _format_scan(self, networks, full=False):
+        """Convert WLAN.scan() tuples to network dicts"""
+        formatted_networks = []
+        configured = None if full or not self._configured else self._configured
+        
+        for ssid, bssid, channel, rssi, authmode, hidden in networks:
+            if configured is not None and ssid not in configured:
+                continue
+            ssid_str = ssid.decode('utf-8') if isinstance(ssid, bytes) else str(ssid)
+            formatted_networks.append({
+                'ssid': ssid_str,
+                'bssid': _format_bssid(bssid),
+                'channel': channel,
+                'rssi': rssi,
+                'authmode': authmode,
+                'hidden': hidden
+            })
+        
+        return formatted_networks
+    
     def connect_to_networks(self, network_list):
         """Try to connect to networks in priority order"""
         if not self.initialized or not network_list:
             return False
         
-        # Sort networks by priority
-        sorted_networks = sorted(network_list, key=lambda x: x.get('priority', 999))
+        # Sort networks by priority (copy, so the config keeps its order)
+        sorted_networks = list(network_list)
+        sorted_networks.sort(key=_priority)
         
+        tried = refused = 0
         for network_config in sorted_networks:
             ssid = network_config.get('ssid')
             password = network_config.get('password')
@@ -78,15 +236,43 @@ class PicoWWifiManager:
                 
             print(f"[WIFI] Trying to connect to: {ssid}")
             
+            self._auth_refused = False
             if self._connect_single(ssid, password):
                 self.connected = True
                 self.current_ssid = ssid
+                self.auth_failed = False
                 return True
+            tried += 1
+            refused += self._auth_refused
         
         self.connected = False
+        self.auth_failed = tried > 0 and refused == tried
         return False
     
-    def _connect_single(self, ssid, password):
+    def connect_cached(self, ssid, password, bssid=None):
+        """Connect straight to a remembered network, pinned to its BSSID when known"""
+        if not self.initialized:
+            return False
+        
+        self._auth_refused = False
+        if self._connect_single(ssid, password, bssid):
+            self.connected = True
+            self.current_ssid = ssid
+            return True
+        return False
+    
+    def get_link_info(self):
+        """Identify the current link for the WiFi cache"""
+        if not self.connected:
+            return None
+        try:
+            channel = self.network.config('channel')
+        except (ValueError, OSError):
+            channel = None
+        # cyw43 does not report the joined BSSID
+        return {'ssid': self.current_ssid, 'bssid': None, 'channel': channel}
+    
+    def _connect_single(self, ssid, password, bssid=None):
         """Connect to a single network"""
         try:
             # Disconnect if already connected
@@ -94,17 +280,30 @@ class PicoWWifiManager:
                 self.network.disconnect()
                 time.sleep(1)
             
+            import network
+            
             # Connect to network
-            self.network.connect(ssid, password)
+            if bssid:
+                self.network.connect(ssid, password, bssid=unhexlify(bssid.replace(':', '')))
+            else:
+                self.network.connect(ssid, password)
             
-            # Wait for connection (max 10 seconds)
-            for i in range(20):
+            # Wait for connection (max 10 seconds), giving up early on a
+            # status that cannot turn into a connection
+            failed = (network.STAT_WRONG_PASSWORD, network.STAT_NO_AP_FOUND, network.STAT_CONNECT_FAIL)
+            deadline = utime.ticks_add(utime.ticks_ms(), 10000)
+            while utime.ticks_diff(deadline, utime.ticks_ms()) > 0:
                 if self.network.isconnected():
                     ip = self.network.ifconfig()[0]
                     self.ip_address = ip
                     print(f"[WIFI] Connected to {ssid} - IP: {ip}")
                     return True
-                time.sleep(0.5)
+                status = self.network.status()
+                if status in failed:
+                    print(f"[WIFI] Connection to {ssid} refused (status {status})")
+                    self._auth_refused = status == network.STAT_WRONG_PASSWORD
+                    return False
+                utime.sleep_ms(50)
             
             print(f"[WIFI] Timeout connecting to {ssid}")
             return False
@@ -172,11 +371,15 @@ class PicoWWifiManager:
             
             print(f"[WIFI] Syncing NTP time from {ntp_server}")
             
-            # Set NTP server
-            ntptime.host = ntp_server
+            # Set NTP server by IP so settime() skips the DNS lookup
+            ntptime.host = self._resolve_ntp(ntp_server)
             
             # Synchronize time
-            ntptime.settime()
+            try:
+                ntptime.settime()
+            except Exception:
+                self._ntp_ip = None  # Resolve again next time
+                raise
             
             print("[WIFI] NTP time synchronized successfully")
             return True
@@ -185,6 +388,48 @@ class PicoWWifiManager:
             print(f"[WIFI] NTP sync failed: {e}")
             return False
     
+    def get_ntp_offset(self, ntp_server=None):
+        """(offset_seconds, offset_ms) of NTP time minus the local clock, or None"""
+        try:
+            import ntptime
+            
+            if not ntp_server:
+                ntp_server = "pool.ntp.org"
+            
+            ntptime.host = self._resolve_ntp(ntp_server)
+            try:
+                ntp_seconds = ntptime.time()
+            except Exception:
+                self._ntp_ip = None  # Resolve again next time
+                raise
+            
+            # ntptime.time() uses the port's epoch, same as utime.time()
+            offset = ntp_seconds - utime.time()
+            return offset, offset * 1000
+            
+        except Exception as e:
+            print(f"[WIFI] NTP offset failed: {e}")
+            return None
+    
+    def _resolve_ntp(self, ntp_server):
+        """NTP server IP, from cache when fresh; the gateway if DNS fails"""
+        now = utime.ticks_ms()
+        if (self._ntp_ip and self._ntp_host == ntp_server
+                and utime.ticks_diff(now, self._ntp_ip_ts) < self._ntp_ttl_ms):
+            return self._ntp_ip
+        
+        try:
+            import socket
+            self._ntp_ip = socket.getaddrinfo(ntp_server, 123)[0][-1][0]
+            self._ntp_host = ntp_server
+            self._ntp_ip_ts = now
+            return self._ntp_ip
+        except OSError as e:
+            # Routers commonly answer NTP themselves
+            gateway = self.network.ifconfig()[2]
+            print(f"[WIFI] DNS failed for {ntp_server} ({e}), trying gateway {gateway}")
+            return gateway
+    
     def disconnect(self):
         """Disconnect from WiFi"""
         if self.network and self.connected:
@@ -221,8 +466,25 @@ class ESP8285WifiManager:
         self.error_count = 0
         self.last_scan = []
         self.initialized = False
-        self.last_command_time = 0  # To prevent command flooding
-        self.command_cooldown = 100  # Minimum ms between commands
+        self.auth_failed = False  # Every network in the last pass refused the password
+        self._auth_refused = False
+        self._configured = _configured_ssids(config)  # Scans keep only these unless forced
+        self.command_cooldown = 100  # Rest after heavy commands (CWLAP, CWJAP)
+        self._verbose = config.get("wifi", {}).get("verbose", False)  # Trace AT traffic
+        self._cooldown_next_ms = utime.ticks_ms()  # No command before this
+        self._heavy = False  # Last command needs the cooldown
+        self._in_command_mode = False  # Cleared by anything entering passthrough (CIPSEND)
+        self._poll = None  # Blocks on UART RX instead of sleep-polling
+        self._rx_flag = None  # Set by the UART RX idle IRQ for async waiters
+        self._busy = False  # An AT transaction owns the UART and _rx_buf
+        # Reused for every reply; emptied with buf[:] = b"" so its capacity stays
+        self._rx_buf = bytearray(2048)
+        self._rx_chunk = memoryview(bytearray(256))  # readinto() target, no per-read alloc
+        self._last_scan_ms = 0  # When last_scan was taken
+        self.scan_cache_ms = 30000  # How long last_scan can stand in for CWLAP
+        self._conn_cache_ts = None  # Last verified connection, None = re-check
+        self._conn_cache_ms = 5000  # How long a verified connection is trusted
+        self._ntpcfg = None  # (server, timezone, command) of the last custom NTP config
         
     def initialize(self):
         """Initialize ESP8285 via UART"""
@@ -245,9 +507,16 @@ class ESP8285WifiManager:
             print(f"[WIFI] UART: id={uart_id}, tx={tx_pin}, rx={rx_pin}")
             
             # Initialize UART
+            # Larger RX buffer absorbs CWLAP bursts once the baudrate is raised
             self.uart = UART(uart_id, baudrate=115200, 
                             tx=Pin(tx_pin), 
-                            rx=Pin(rx_pin))
+                            rx=Pin(rx_pin),
+                            rxbuf=2048)
+            self._poll = select.poll()
+            self._poll.register(self.uart, select.POLLIN)
+            if asyncio and hasattr(UART, 'IRQ_RXIDLE'):
+                self._rx_flag = asyncio.ThreadSafeFlag()
+                self.uart.irq(handler=self._on_rx, trigger=UART.IRQ_RXIDLE)
             
             # Clear UART buffer
             if self.uart.any():
@@ -262,20 +531,19 @@ class ESP8285WifiManager:
             if self.uart.any():
                 self.uart.read()
             
-            # Test communication
+            # Test communication and turn off echo in one exchange
             print("[WIFI] Testing AT command")
-            success, response = self._send_at_command("AT", timeout_ms=2000)
+            oks, response = self._send_at_batch((_AT, _AT_ECHO_OFF), 2, timeout_ms=2000)
             
-            if success:
+            if oks:
                 self.initialized = True
+                self._in_command_mode = True
                 print("[WIFI] ESP8285 initialized successfully")
                 
-                # Turn off echo
-                self._send_at_command("ATE0")
-                
-                return True
+                # False only if the baud switch left the module unreachable
+                return self._raise_baudrate(wifi_config.get("baud", 921600))
             else:
-                print(f"[WIFI] ESP8285 not responding. Response: {response}")
+                print(f"[WIFI] ESP8285 not responding. Response: {response.decode('utf-8', 'ignore')}")
                 return False
                 
         except Exception as e:
@@ -284,121 +552,358 @@ class ESP8285WifiManager:
             sys.print_exception(e)
             return False
     
+    def _raise_baudrate(self, baud):
+        """Move ESP8285 and the local UART to a faster baudrate, keeping 115200 on failure
+        
+        Returns False, and marks the manager uninitialized, if both ends can't be brought
+        back to a common baudrate.
+        """
+        if baud <= 115200:
+            return True
+        
+        # UART_CUR is not persisted, so a reset always brings the module back to 115200
+        success, _ = self._send_at_command(f"AT+UART_CUR={baud},8,1,0,0", timeout_ms=500)
+        if not success:
+            print(f"[WIFI] ESP8285 refused {baud} baud, staying at 115200")
+            return True
+        
+        # Framing must match the 8,1,0,0 (8N1, no flow control) just requested
+        self.uart.init(baudrate=baud, bits=8, parity=None, stop=1)
+        time.sleep(0.1)
+        success, _ = self._send_at_command(_AT, timeout_ms=500)
+        if success:
+            print(f"[WIFI] UART running at {baud} baud")
+            return True
+        
+        # The module acknowledged the switch, so it is most likely at the new baud:
+        # ask it back to 115200 at that speed before moving the local UART
+        print(f"[WIFI] No reply at {baud} baud, moving both ends back to 115200")
+        self._send_at_command(_AT_UART_CUR_DEFAULT, timeout_ms=500)
+        self.uart.init(baudrate=115200, bits=8, parity=None, stop=1)
+        time.sleep(0.1)
+        if self.uart.any():
+            self.uart.read()  # Drop anything garbled by the switch
+        success, _ = self._send_at_command(_AT, timeout_ms=500)
+        if success:
+            print("[WIFI] ESP8285 back at 115200 baud")
+            return True
+        
+        # Baudrates out of step: every later AT command would fail, so don't claim the link
+        print("[WIFI] ESP8285 unreachable after baud switch - reset the module to recover")
+        self.initialized = False
+        self._in_command_mode = False
+        return False
+    
     def _send_at_command(self, command, expected="OK", timeout_ms=5000):
         """Send command to ESP8285 and return success, response tuple with cooldown protection"""
+        success, raw = self._send_at_raw(command, expected, timeout_ms)
+        try:
+            response = raw.decode('utf-8', 'ignore')
+        except:
+            response = raw.decode('latin-1', 'ignore')
+        return success, response
+    
+    def _send_at_raw(self, command, expected="OK", timeout_ms=5000):
+        """Send command to ESP8285 and return success, undecoded response bytes"""
         if not self.uart:
-            return False, ""
+            return False, b""
+        # An async command is mid-reply; writing now would mix the two replies
+        if self._busy:
+            _dbg(f"[WIFI] UART busy, '{command}' skipped")
+            return False, b""
         
+        self._busy = True
         try:
             # Add cooldown between commands to prevent ESP8285 overload
-            current_time = utime.ticks_ms()
-            time_since_last = utime.ticks_diff(current_time, self.last_command_time)
-            if time_since_last < self.command_cooldown:
-                time.sleep((self.command_cooldown - time_since_last) / 1000)
+            wait = self._cooldown_wait()
+            if wait > 0:
+                time.sleep(wait / 1000)
+            
+            self._write_command(command)
+            
+            # Wait for response, appending in place to the shared RX buffer
+            deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+            wait_until = deadline
+            buf = self._rx_buf
+            buf[:] = b""
+            expected_b = expected.encode()
+            
+            while True:
+                # Sleep until RX data, the command deadline or, once data has
+                # started arriving, 1s of silence
+                remaining = utime.ticks_diff(wait_until, utime.ticks_ms())
+                if remaining <= 0 or not self._poll.poll(remaining):
+                    break
+                
+                n = self.uart.any()
+                if n:
+                    # Search only the new bytes plus a short overlap for
+                    # the expected response or error
+                    start = max(0, len(buf) - 16)
+                    if self._drain(buf, n):
+                        wait_until = self._idle_deadline(deadline)
+                        
+                        window = buf[start:]
+                        if expected_b in window or b"ERROR" in window:
+                            break
             
-            self.last_command_time = utime.ticks_ms()
+            return self._finish_response(buf, expected_b)
             
-            # Clear UART buffer
-            if self.uart.any():
-                self.uart.read()
+        except Exception as e:
+            print(f"[WIFI] Command '{command}' failed: {e}")
+            return False, b""
+        finally:
+            self._busy = False
+    
+    async def _send_at_raw_async(self, command, expected="OK", timeout_ms=5000):
+        """Like _send_at_raw, but yields to other tasks while the ESP8285 replies"""
+        if not self.uart:
+            return False, b""
+        # Wait for any other task's transaction to finish its reply
+        while self._busy:
+            await asyncio.sleep_ms(10)
+        
+        self._busy = True
+        try:
+            wait = self._cooldown_wait()
+            if wait > 0:
+                await asyncio.sleep_ms(wait)
             
-            # Send command
-            print(f"[WIFI] AT: {command}")
-            self.uart.write(command + '\r\n')
+            self._write_command(command)
             
-            # Wait for response
-            start_time = utime.ticks_ms()
-            response = ""
-            last_data_time = start_time
+            deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+            wait_until = deadline
+            buf = self._rx_buf
+            buf[:] = b""
+            expected_b = expected.encode()
             
-            while utime.ticks_diff(utime.ticks_ms(), start_time) < timeout_ms:
-                if self.uart.any():
-                    data = self.uart.read()
-                    if data:
+            while True:
+                remaining = utime.ticks_diff(wait_until, utime.ticks_ms())
+                if remaining <= 0:
+                    break
+                
+                n = self.uart.any()
+                if not n:
+                    # RX idle IRQ wakes us; without it fall back to short naps
+                    if self._rx_flag:
                         try:
-                            response += data.decode('utf-8', 'ignore')
-                        except:
-                            response += data.decode('latin-1', 'ignore')
-                        last_data_time = utime.ticks_ms()
+                            await asyncio.wait_for_ms(self._rx_flag.wait(), remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        await asyncio.sleep_ms(min(remaining, 10))
+                    continue
+                
+                start = max(0, len(buf) - 16)
+                if self._drain(buf, n):
+                    wait_until = self._idle_deadline(deadline)
                     
-                    # Check if we have expected response or error
-                    if expected in response or "ERROR" in response:
+                    window = buf[start:]
+                    if expected_b in window or b"ERROR" in window:
                         break
-                
-                # If no data received for a while, break to avoid infinite loop
-                if utime.ticks_diff(utime.ticks_ms(), last_data_time) > 1000 and response:
-                    break
-                
-                time.sleep(0.01)
             
-            response = response.strip()
-            if response:
-                # Clean up response for logging
-                clean_response = response.replace('\r', '\\r').replace('\n', '\\n')
-                print(f"[WIFI]   -> {clean_response[:100]}")  # Limit log length
+            return self._finish_response(buf, expected_b)
             
-            success = expected in response
-            # Sometimes response might be OK without the expected string
-            if not success and ("OK" in response or "SEND OK" in response):
-                success = True
+        except Exception as e:
+            print(f"[WIFI] Command '{command}' failed: {e}")
+            return False, b""
+        finally:
+            self._busy = False
+    
+    def _send_at_batch(self, commands, min_oks, timeout_ms=5000):
+        """Write several terminated commands at once; return OK count, response"""
+        if not self.uart:
+            return 0, b""
+        if self._busy:
+            _dbg("[WIFI] UART busy, batch skipped")
+            return 0, b""
+        
+        self._busy = True
+        try:
+            wait = self._cooldown_wait()
+            if wait > 0:
+                time.sleep(wait / 1000)
+            
+            self._write_command(b"".join(commands))
             
-            return success, response
+            deadline = utime.ticks_add(utime.ticks_ms(), timeout_ms)
+            buf = self._rx_buf
+            buf[:] = b""
+            oks = 0
+            
+            # Every command answers OK or ERROR; stop once all have answered
+            while True:
+                remaining = utime.ticks_diff(deadline, utime.ticks_ms())
+                if remaining <= 0 or not self._poll.poll(remaining):
+                    break
+                
+                n = self.uart.any()
+                if n:
+                    start = max(0, len(buf) - 16)
+                    if self._drain(buf, n):
+                        # Recount only when a reply ends in the new bytes
+                        window = buf[start:]
+                        if b"OK\r\n" in window or b"ERROR" in window:
+                            response = bytes(buf)
+                            oks = response.count(b"OK\r\n")
+                            if oks >= min_oks or oks + response.count(b"ERROR") >= len(commands):
+                                break
+            
+            self._end_command()
+            if self._verbose:
+                print("[WIFI]   ->", oks, "OK")
+            return oks, bytes(buf)
             
         except Exception as e:
-            print(f"[WIFI] Command '{command}' failed: {e}")
-            return False, ""
+            print(f"[WIFI] Batch command failed: {e}")
+            return 0, b""
+        finally:
+            self._busy = False
+    
+    def _drain(self, buf, n):
+        """Append up to n waiting RX bytes to buf via the preallocated chunk"""
+        chunk = self._rx_chunk
+        k = self.uart.readinto(chunk, min(n, len(chunk)))
+        if k:
+            buf.extend(chunk[:k])
+        return k
+    
+    def _on_rx(self, uart):
+        """UART RX idle IRQ - wake the task waiting in _send_at_raw_async"""
+        self._rx_flag.set()
+    
+    def _cooldown_wait(self):
+        """Milliseconds to wait before the next command may be sent"""
+        wait = utime.ticks_diff(self._cooldown_next_ms, utime.ticks_ms())
+        # A deadline left untouched for ~6 days wraps to a huge wait - ignore it
+        if wait <= 0 or wait > self.command_cooldown:
+            return 0
+        return wait
+    
+    def _end_command(self):
+        """Start the cooldown if the command just answered was a heavy one"""
+        if self._heavy:
+            self._cooldown_next_ms = utime.ticks_add(utime.ticks_ms(), self.command_cooldown)
+    
+    def _write_command(self, command):
+        """Flush stale RX and write one AT command"""
+        # Anything but a status query may change the link - re-verify next time
+        if command not in _AT_STATUS_QUERIES:
+            self._conn_cache_ts = None
+        
+        # Clear UART buffer
+        if self.uart.any():
+            self.uart.read()
+        
+        # Send command (bytes constants are already terminated)
+        if isinstance(command, str):
+            payload = (command + '\r\n').encode()
+        elif command.endswith(b"\r\n"):
+            payload = command
+        else:
+            payload = command + b"\r\n"
+        
+        # Only scans, joins and sends load the ESP8285 enough to need a rest
+        self._heavy = (payload.startswith(b"AT+CWLAP") or payload.startswith(b"AT+CWJAP=")
+                       or payload.startswith(b"AT+CIPSEND"))
+        if self._verbose:
+            print("[WIFI] AT:", payload[:-2].decode())
+        self.uart.write(payload)
+    
+    def _idle_deadline(self, deadline):
+        """Response end after 1s of silence, capped at the command deadline"""
+        idle_deadline = utime.ticks_add(utime.ticks_ms(), 1000)
+        if utime.ticks_diff(idle_deadline, deadline) < 0:
+            return idle_deadline
+        return deadline
+    
+    def _finish_response(self, buf, expected_b):
+        """Copy the reply out of the RX buffer, log it and decide success"""
+        self._end_command()
+        response = bytes(buf).strip()
+        if response and self._verbose:
+            # Clean up only the logged head, not a multi-KB scan reply
+            clean_response = response[:100].replace(b'\r', b'\\r').replace(b'\n', b'\\n')
+            print("[WIFI]   ->", clean_response.decode())
+        
+        success = expected_b in response
+        # Sometimes response might be OK without the expected string
+        if not success and b"OK" in response:
+            success = True
+        
+        return success, response
+    
+    def _parse_staip(self, data):
+        """Station IP from an AT+CIFSR reply, "" if absent"""
+        p = data.find(b"STAIP")
+        if p < 0:
+            return ""
+        end = data.find(b"\n", p)
+        if end < 0:
+            end = len(data)
+        
+        # +CIFSR:STAIP,"192.168.0.10" - quoted on most firmwares
+        q = data.find(b'"', p, end)
+        if q >= 0:
+            r = data.find(b'"', q + 1, end)
+            return data[q + 1:r].decode() if r >= 0 else ""
+        
+        # Unquoted: value follows the separator after STAIP
+        return data[p + 6:end].strip().decode()
     
-    def scan_networks(self):
-        """Scan for WiFi networks using ESP8285"""
+    def scan_networks(self, force_full_scan=False):
+        """Scan for WiFi networks using ESP8285, only configured ones unless force_full_scan"""
         if not self.initialized:
             return []
         
         try:
             # Set to station mode
-            success, _ = self._send_at_command("AT+CWMODE=1")
+            success, _ = self._send_at_command(_AT_CWMODE_STA)
             if not success:
                 print("[WIFI] Failed to set station mode")
                 return []
             
-            # Scan networks (longer timeout for scan)
-            success, response = self._send_at_command("AT+CWLAP", timeout_ms=15000)
+            # Scan networks (longer timeout for scan), parsed straight from bytes
+            success, response = self._send_at_raw(_AT_CWLAP, timeout_ms=15000)
             
             networks = []
+            configured = None if force_full_scan or not self._configured else self._configured
             if success and response:
-                lines = response.split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if '+CWLAP:' in line:
-                        try:
-                            # Parse response format: +CWLAP:(auth,SSID,RSSI,MAC,channel)
-                            start_idx = line.find('(')
-                            end_idx = line.rfind(')')
-                            if start_idx != -1 and end_idx != -1 and end_idx > start_idx:
-                                data_part = line[start_idx+1:end_idx]
-                                parts = [part.strip() for part in data_part.split(',')]
-                                
-                                if len(parts) >= 5:
-                                    auth = int(parts[0]) if parts[0].isdigit() else 0
-                                    ssid = parts[1].strip('"')
-                                    rssi = int(parts[2]) if parts[2].lstrip('-').isdigit() else -100
-                                    mac = parts[3].strip('"')
-                                    channel = int(parts[4]) if parts[4].isdigit() else 0
-                                    
-                                    networks.append({
-                                        'ssid': ssid,
-                                        'bssid': mac,
-                                        'channel': channel,
-                                        'rssi': rssi,
-                                        'authmode': auth,
-                                        'hidden': False
-                                    })
-                        except Exception as e:
-                            print(f"[WIFI] Error parsing network info: {e}")
-                            continue
+                # Entry format: +CWLAP:(auth,"SSID",RSSI,"MAC",channel,...)
+                i = 0
+                while True:
+                    p = response.find(b"+CWLAP:(", i)
+                    if p < 0:
+                        break
+                    c = response.find(b",", p + 8)
+                    # SSID may contain commas, so it ends at the quote-comma
+                    q = response.find(b'",', c + 2)
+                    e = response.find(b")", q)
+                    if c < 0 or q < 0 or e < 0:
+                        break
+                    i = e + 1
+                    
+                    # Drop unconfigured APs before any of their fields are copied
+                    if configured is not None and response[c + 2:q] not in configured:
+                        continue
+                    
+                    parts = response[q + 2:e].split(b",")
+                    if len(parts) < 3:
+                        continue
+                    
+                    networks.append({
+                        'ssid': response[c + 2:q].decode('utf-8', 'ignore'),
+                        'bssid': parts[1].strip(b'"').decode(),
+                        'channel': _int_or(parts[2], 0),
+                        'rssi': _int_or(parts[0], -100),
+                        'authmode': _int_or(response[p + 8:c], 0),
+                        'hidden': False
+                    })
             
             # Sort by RSSI (strongest first)
             networks.sort(key=lambda x: x['rssi'], reverse=True)
             self.last_scan = networks
+            self._last_scan_ms = utime.ticks_ms()
             
             print(f"[WIFI] ESP8285 found {len(networks)} networks")
             return networks
@@ -414,7 +919,7 @@ class ESP8285WifiManager:
             return False
         
         # PRIMEIRO: Verificar se já estamos conectados a alguma das redes configuradas
-        print("[WIFI] Checking for existing connections to configured networks...")
+        _dbg("[WIFI] Checking for existing connections to configured networks...")
         connected, connected_ssid = self.check_existing_connection()
         
         if connected and connected_ssid:
@@ -424,26 +929,15 @@ class ESP8285WifiManager:
                 if ssid == connected_ssid:
                     print(f"[WIFI] Already connected to configured network: {ssid}")
                     # Obter IP e atualizar status
-                    success, ip_response = self._send_at_command("AT+CIFSR", timeout_ms=3000)
+                    success, ip_response = self._send_at_raw(_AT_CIFSR, timeout_ms=3000)
                     if success and ip_response:
-                        for line in ip_response.split('\n'):
-                            line = line.strip()
-                            if 'STAIP' in line or 'CIFSR:STAIP' in line:
-                                if '"' in line:
-                                    ip = line.split('"')[1]
-                                elif ':' in line:
-                                    ip = line.split(':')[-1].strip()
-                                elif ',' in line:
-                                    ip = line.split(',')[-1].strip()
-                                else:
-                                    continue
-                                
-                                if ip and ip != '0.0.0.0':
-                                    self.ip_address = ip
-                                    self.connected = True
-                                    self.current_ssid = ssid
-                                    print(f"[WIFI] Using existing connection - IP: {ip}")
-                                    return True
+                        ip = self._parse_staip(ip_response)
+                        if ip and ip != '0.0.0.0':
+                            self.ip_address = ip
+                            self.connected = True
+                            self.current_ssid = ssid
+                            print(f"[WIFI] Using existing connection - IP: {ip}")
+                            return True
                     
                     # Se chegou aqui, está conectado mas não tem IP ainda
                     self.ip_address = "Connected (no IP)"
@@ -452,11 +946,13 @@ class ESP8285WifiManager:
                     return True
         
         # SEGUNDO: Se não está conectado, tentar conectar na ordem de prioridade
-        print("[WIFI] No existing connection found, attempting new connections...")
+        _dbg("[WIFI] No existing connection found, attempting new connections...")
         
         # Ordenar redes por prioridade
-        sorted_networks = sorted(network_list, key=lambda x: x.get('priority', 999))
+        sorted_networks = list(network_list)
+        sorted_networks.sort(key=_priority)
         
+        tried = refused = 0
         for network_config in sorted_networks:
             ssid = network_config.get('ssid')
             password = network_config.get('password')
@@ -466,134 +962,165 @@ class ESP8285WifiManager:
             
             print(f"[WIFI] ESP8285 trying to connect to: {ssid}")
             
+            self._auth_refused = False
             if self._connect_single(ssid, password):
                 self.connected = True
                 self.current_ssid = ssid
+                self.auth_failed = False
                 return True
+            tried += 1
+            refused += self._auth_refused
         
         self.connected = False
+        self.auth_failed = tried > 0 and refused == tried
         return False
     
+    def connect_cached(self, ssid, password, bssid=None):
+        """Connect straight to a remembered network, pinned to its BSSID and without CWLAP"""
+        if not self.initialized:
+            return False
+        
+        self._auth_refused = False
+        if self._connect_single(ssid, password, bssid):
+            self.connected = True
+            self.current_ssid = ssid
+            return True
+        return False
+    
+    def get_link_info(self):
+        """Identify the current link for the WiFi cache"""
+        success, response = self._send_at_raw(_AT_CWJAP_Q, timeout_ms=3000)
+        if not success:
+            return None
+        # Formato: +CWJAP:"ssid","bssid",channel,rssi
+        field = _parse_at_response(response)[1].get(b"CWJAP")
+        ssid = _quoted_ssid(field)
+        if ssid is None:
+            return None
+        j = field.find(b'","')
+        k = field.find(b'",', j + 3) if j >= 0 else -1
+        if k < 0:
+            return None
+        end = field.find(b',', k + 2)
+        channel = _int_or(field[k + 2:end], None) if end >= 0 else None
+        return {'ssid': ssid, 'bssid': field[j + 3:k].decode(), 'channel': channel}
+    
     # No arquivo networking_driver.py, na classe ESP8285WifiManager:
 
-    def _connect_single(self, ssid, password):
+    def _connect_single(self, ssid, password, bssid=None):
         """Connect to a single network using ESP8285 - with existing connection check"""
         try:
-            print(f"[WIFI] Starting connection process to {ssid}")
+            _dbg(f"[WIFI] Starting connection process to {ssid}")
             
             # PRIMEIRO: Verificar se já estamos conectados a uma rede
-            print("[WIFI] Checking if already connected...")
-            success, response = self._send_at_command("AT+CWJAP?", timeout_ms=3000)
+            _dbg("[WIFI] Checking if already connected...")
+            success, response = self._send_at_raw(_AT_CWJAP_Q, timeout_ms=3000)
             
-            if success and response:
-                # Analisar resposta para ver a qual rede estamos conectados
-                for line in response.split('\n'):
-                    line = line.strip()
-                    if '+CWJAP:' in line:
-                        # Exemplo: +CWJAP:"ssid","mac",channel,rssi
-                        parts = line.split(',')
-                        if len(parts) > 0:
-                            # Extrair SSID da resposta
-                            if '"' in parts[0]:
-                                connected_ssid = parts[0].split('"')[1]
-                                print(f"[WIFI] Already connected to: {connected_ssid}")
-                                
-                                # Se já estamos conectados à rede desejada
-                                if connected_ssid == ssid:
-                                    print(f"[WIFI] Already connected to target network {ssid}")
-                                    
-                                    # Obter IP atual
-                                    success, ip_response = self._send_at_command("AT+CIFSR", timeout_ms=3000)
-                                    if success and ip_response:
-                                        # Extrair IP
-                                        for ip_line in ip_response.split('\n'):
-                                            ip_line = ip_line.strip()
-                                            if 'STAIP' in ip_line or 'CIFSR:STAIP' in ip_line:
-                                                if '"' in ip_line:
-                                                    ip = ip_line.split('"')[1]
-                                                elif ':' in ip_line:
-                                                    ip = ip_line.split(':')[-1].strip()
-                                                elif ',' in ip_line:
-                                                    ip = ip_line.split(',')[-1].strip()
-                                                else:
-                                                    continue
-                                                
-                                                if ip and ip != '0.0.0.0':
-                                                    self.ip_address = ip
-                                                    self.connected = True
-                                                    self.current_ssid = ssid
-                                                    print(f"[WIFI] Using existing connection to {ssid} - IP: {ip}")
-                                                    return True
-                                    
-                                    # Se chegou aqui, está conectado mas não conseguiu IP
-                                    print(f"[WIFI] Already connected to {ssid} (getting IP)")
-                                    self.ip_address = "Connected (getting IP)"
-                                    self.connected = True
-                                    self.current_ssid = ssid
-                                    return True
-                                else:
-                                    print(f"[WIFI] Connected to different network: {connected_ssid}")
-                                    print(f"[WIFI] Disconnecting from {connected_ssid}...")
-                                    self._send_at_command("AT+CWQAP")
-                                    time.sleep(2)
+            # Exemplo: +CWJAP:"ssid","mac",channel,rssi
+            connected_ssid = _quoted_ssid(_parse_at_response(response)[1].get(b"CWJAP")) if success else None
+            if connected_ssid is not None:
+                print(f"[WIFI] Already connected to: {connected_ssid}")
+                
+                # Se já estamos conectados à rede desejada
+                if connected_ssid == ssid:
+                    print(f"[WIFI] Already connected to target network {ssid}")
+                    
+                    # Obter IP atual
+                    success, ip_response = self._send_at_raw(_AT_CIFSR, timeout_ms=3000)
+                    if success and ip_response:
+                        # Extrair IP
+                        ip = self._parse_staip(ip_response)
+                        if ip and ip != '0.0.0.0':
+                            self.ip_address = ip
+                            self.connected = True
+                            self.current_ssid = ssid
+                            print(f"[WIFI] Using existing connection to {ssid} - IP: {ip}")
+                            return True
+                    
+                    # Se chegou aqui, está conectado mas não conseguiu IP
+                    print(f"[WIFI] Already connected to {ssid} (getting IP)")
+                    self.ip_address = "Connected (getting IP)"
+                    self.connected = True
+                    self.current_ssid = ssid
+                    return True
+                else:
+                    print(f"[WIFI] Connected to different network: {connected_ssid}")
+                    print(f"[WIFI] Disconnecting from {connected_ssid}...")
+                    self._send_at_command(_AT_CWQAP)
+                    time.sleep(2)
             
             # SEGUNDO: Se não está conectado ou está na rede errada, conectar
-            print(f"[WIFI] Not connected to target network, proceeding with connection...")
-            
-            # Sair do modo transparente
-            print("[WIFI] Ensuring command mode...")
-            self.uart.write('+++')
-            time.sleep(1.5)
+            _dbg("[WIFI] Not connected to target network, proceeding with connection...")
             
-            # Limpar buffer
-            for _ in range(3):
-                if self.uart.any():
-                    self.uart.read()
-                time.sleep(0.1)
+            # Sair do modo transparente, só se algo nos tirou do modo de comando
+            if not self._in_command_mode:
+                _dbg("[WIFI] Ensuring command mode...")
+                self.uart.write('+++')
+                time.sleep(1.5)
+                
+                # Limpar buffer
+                for _ in range(3):
+                    if self.uart.any():
+                        self.uart.read()
+                    time.sleep(0.1)
             
             # Verificar se está respondendo
-            print("[WIFI] Testing AT command...")
-            success, response = self._send_at_command("AT", timeout_ms=2000)
+            _dbg("[WIFI] Testing AT command...")
+            success, response = self._send_at_command(_AT, timeout_ms=2000)
             if not success:
                 print(f"[WIFI] ESP8285 not responding: {response}")
+                self._in_command_mode = False
                 return False
-            
-            # Configurar modo (tentar algumas vezes)
-            for attempt in range(3):
-                print(f"[WIFI] Setting station mode (attempt {attempt+1}/3)...")
-                success, response = self._send_at_command("AT+CWMODE=1")
-                if success:
-                    print("[WIFI] Station mode set successfully")
-                    break
-                else:
-                    print(f"[WIFI] Failed to set station mode: {response}")
-                    if attempt < 2:
-                        time.sleep(1)
+            self._in_command_mode = True
+            
+            # Modo estação e conexão única num só envio
+            oks, _ = self._send_at_batch((_AT_CWMODE_STA, _AT_CIPMUX_SINGLE), 2)
+            if oks < 2:
+                # Configurar modo (tentar algumas vezes)
+                for attempt in range(3):
+                    _dbg(f"[WIFI] Setting station mode (attempt {attempt+1}/3)...")
+                    success, response = self._send_at_command(_AT_CWMODE_STA)
+                    if success:
+                        _dbg("[WIFI] Station mode set successfully")
+                        break
                     else:
-                        return False
-            
-            # Desabilitar conexões múltiplas
-            self._send_at_command("AT+CIPMUX=0")
-            
-            # Verificar redes disponíveis antes de tentar conectar
-            print("[WIFI] Scanning for available networks...")
-            success, scan_response = self._send_at_command("AT+CWLAP", timeout_ms=10000)
-            
-            target_network_found = False
-            if success and scan_response:
-                for line in scan_response.split('\n'):
-                    if ssid in line:
-                        print(f"[WIFI] Target network {ssid} found in scan")
+                        print(f"[WIFI] Failed to set station mode: {response}")
+                        if attempt < 2:
+                            time.sleep(1)
+                        else:
+                            return False
+                
+                # Desabilitar conexões múltiplas
+                self._send_at_command(_AT_CIPMUX_SINGLE)
+            
+            # Verificar redes disponíveis antes de tentar conectar; um scan
+            # recente que já contém a rede, ou um BSSID do cache, dispensa um novo AT+CWLAP
+            target_network_found = bool(bssid)
+            if not target_network_found and self.last_scan and utime.ticks_diff(utime.ticks_ms(), self._last_scan_ms) < self.scan_cache_ms:
+                for net in self.last_scan:
+                    if net['ssid'] == ssid:
+                        print(f"[WIFI] Target network {ssid} found in recent scan")
                         target_network_found = True
                         break
             
+            if not target_network_found:
+                _dbg("[WIFI] Scanning for available networks...")
+                success, scan_response = self._send_at_command(_AT_CWLAP, timeout_ms=10000)
+                
+                if success and ssid in scan_response:
+                    print(f"[WIFI] Target network {ssid} found in scan")
+                    target_network_found = True
+            
             if not target_network_found:
                 print(f"[WIFI] Warning: Network {ssid} not found in scan")
                 print("[WIFI] Will attempt connection anyway...")
             
             # Conectar à rede
-            print(f"[WIFI] Connecting to {ssid}...")
-            cmd = f'AT+CWJAP="{ssid}","{password}"'
+            _dbg(f"[WIFI] Connecting to {ssid}...")
+            if bssid:
+                cmd = f'AT+CWJAP="{ssid}","{password}","{bssid}"'
+            else:
+                cmd = f'AT+CWJAP="{ssid}","{password}"'
             
             # Tentativa de conexão com timeout longo
             success, response = self._send_at_command(cmd, timeout_ms=30000)
@@ -606,47 +1133,35 @@ class ESP8285WifiManager:
                 for indicator in connection_indicators:
                     if indicator in response:
                         connection_success = True
-                        print(f"[WIFI] Found success indicator: {indicator}")
+                        _dbg(f"[WIFI] Found success indicator: {indicator}")
                         break
             
             if connection_success:
                 print(f"[WIFI] Connection to {ssid} appears successful")
                 
                 # Esperar um pouco para estabilizar
-                print("[WIFI] Waiting for connection to stabilize...")
+                _dbg("[WIFI] Waiting for connection to stabilize...")
                 time.sleep(3)
                 
                 # Verificar status da conexão
-                print("[WIFI] Verifying connection status...")
-                success, status_response = self._send_at_command("AT+CWJAP?", timeout_ms=3000)
+                _dbg("[WIFI] Verifying connection status...")
+                success, status_response = self._send_at_raw(_AT_CWJAP_Q, timeout_ms=3000)
                 
-                if success and status_response and ssid in status_response:
+                if success and _quoted_ssid(_parse_at_response(status_response)[1].get(b"CWJAP")) == ssid:
                     print(f"[WIFI] Verified: Connected to {ssid}")
                     
                     # Obter IP
-                    success, ip_response = self._send_at_command("AT+CIFSR", timeout_ms=5000)
+                    success, ip_response = self._send_at_raw(_AT_CIFSR, timeout_ms=5000)
                     
                     if success and ip_response:
                         # Extrair IP
-                        for line in ip_response.split('\n'):
-                            line = line.strip()
-                            if 'STAIP' in line or 'CIFSR:STAIP' in line:
-                                # Extrair IP de diferentes formatos
-                                if '"' in line:
-                                    ip = line.split('"')[1]
-                                elif ':' in line:
-                                    ip = line.split(':')[-1].strip()
-                                elif ',' in line:
-                                    ip = line.split(',')[-1].strip()
-                                else:
-                                    continue
-                                
-                                if ip and ip != '0.0.0.0':
-                                    self.ip_address = ip
-                                    self.connected = True
-                                    self.current_ssid = ssid
-                                    print(f"[WIFI] Successfully connected to {ssid} - IP: {ip}")
-                                    return True
+                        ip = self._parse_staip(ip_response)
+                        if ip and ip != '0.0.0.0':
+                            self.ip_address = ip
+                            self.connected = True
+                            self.current_ssid = ssid
+                            print(f"[WIFI] Successfully connected to {ssid} - IP: {ip}")
+                            return True
                     
                     # Se chegou aqui mas está conectado
                     print(f"[WIFI] Connected to {ssid} (IP assignment pending)")
@@ -661,6 +1176,8 @@ class ESP8285WifiManager:
             else:
                 print(f"[WIFI] Failed to connect to {ssid}")
                 print(f"[WIFI] Response: {response[:200]}")
+                # +CWJAP:2 = senha incorreta, repetir não adianta
+                self._auth_refused = "+CWJAP:2" in response
                 return False
                 
         except Exception as e:
@@ -679,33 +1196,62 @@ class ESP8285WifiManager:
         
         # Se não acreditamos que estamos conectados, não verificar tão frequentemente
         if not self.connected:
-            print("[WIFI] Not connected, skipping detailed check")
+            _dbg("[WIFI] Not connected, skipping detailed check")
             return False
         
+        # Conexão verificada recentemente: confiar nela sem usar a UART
+        ts = self._conn_cache_ts
+        if ts is not None and utime.ticks_diff(utime.ticks_ms(), ts) < self._conn_cache_ms:
+            return True
+        
+        # Outra tarefa está usando a UART: manter o estado atual
+        if self._busy:
+            return self.connected
+        
         try:
             # Verificação mais rápida usando AT+CWJAP?
-            success, response = self._send_at_command("AT+CWJAP?", timeout_ms=2000)
-            
-            if success and response and self.current_ssid:
-                # Verificar se ainda está conectado ao mesmo SSID
-                if self.current_ssid in response:
-                    print(f"[WIFI] Still connected to {self.current_ssid}")
-                    return True
-                else:
-                    print(f"[WIFI] No longer connected to {self.current_ssid}")
-                    self.connected = False
-                    self.current_ssid = None
-                    self.ip_address = "0.0.0.0"
-                    return False
-            else:
-                print("[WIFI] Connection check failed or no response")
-                self.connected = False
-                return False
+            success, response = self._send_at_raw(_AT_CWJAP_Q, timeout_ms=2000)
+            return self._apply_link_status(success, response)
                 
         except Exception as e:
             print(f"[WIFI] Connection check error: {e}")
             # Não marcar como desconectado imediatamente em caso de erro
             return self.connected  # Retorna estado atual em vez de False
+    
+    async def check_connection_async(self):
+        """check_connection() that yields to other tasks during the AT round trip"""
+        if not self.initialized or not self.connected:
+            return False
+        
+        ts = self._conn_cache_ts
+        if ts is not None and utime.ticks_diff(utime.ticks_ms(), ts) < self._conn_cache_ms:
+            return True
+        
+        try:
+            success, response = await self._send_at_raw_async(_AT_CWJAP_Q, timeout_ms=2000)
+            return self._apply_link_status(success, response)
+        except Exception as e:
+            print(f"[WIFI] Connection check error: {e}")
+            return self.connected
+    
+    def _apply_link_status(self, success, response):
+        """Update connection state from an AT+CWJAP? reply"""
+        if success and response and self.current_ssid:
+            # Verificar se ainda está conectado ao mesmo SSID
+            if _quoted_ssid(_parse_at_response(response)[1].get(b"CWJAP")) == self.current_ssid:
+                _dbg(f"[WIFI] Still connected to {self.current_ssid}")
+                self._conn_cache_ts = utime.ticks_ms()
+                return True
+            else:
+                print(f"[WIFI] No longer connected to {self.current_ssid}")
+                self.connected = False
+                self.current_ssid = None
+                self.ip_address = "0.0.0.0"
+                return False
+        else:
+            print("[WIFI] Connection check failed or no response")
+            self.connected = False
+            return False
         
     def check_existing_connection(self):
         """Check if ESP8285 is already connected to a network"""
@@ -713,19 +1259,15 @@ class ESP8285WifiManager:
             return False, None
         
         try:
-            print("[WIFI] Checking for existing connection...")
-            success, response = self._send_at_command("AT+CWJAP?", timeout_ms=3000)
+            _dbg("[WIFI] Checking for existing connection...")
+            success, response = self._send_at_raw(_AT_CWJAP_Q, timeout_ms=3000)
             
             if success and response:
-                for line in response.split('\n'):
-                    line = line.strip()
-                    if '+CWJAP:' in line:
-                        # Formato: +CWJAP:"ssid","mac",channel,rssi
-                        parts = [part.strip() for part in line.split(',')]
-                        if len(parts) > 0 and '"' in parts[0]:
-                            ssid = parts[0].split('"')[1]
-                            print(f"[WIFI] Found existing connection to: {ssid}")
-                            return True, ssid
+                # Formato: +CWJAP:"ssid","mac",channel,rssi
+                ssid = _quoted_ssid(_parse_at_response(response)[1].get(b"CWJAP"))
+                if ssid is not None:
+                    print(f"[WIFI] Found existing connection to: {ssid}")
+                    return True, ssid
             
             print("[WIFI] No existing connection found")
             return False, None
@@ -743,37 +1285,18 @@ class ESP8285WifiManager:
             
             print(f"[WIFI] ESP8285 syncing NTP time from {ntp_server}")
             
-            # Configure NTP with timezone
-            ntp_config_cmd = f'AT+CIPSNTPCFG=1,{timezone},"{ntp_server}"'
-            success, response = self._send_at_command(ntp_config_cmd, timeout_ms=10000)
-            
-            if not success:
-                print("[WIFI] ESP8285 NTP configuration failed")
-                # Try with default server if custom failed
-                if ntp_server != "pool.ntp.org":
-                    print("[WIFI] ESP8285 trying with default NTP server...")
-                    ntp_config_cmd = 'AT+CIPSNTPCFG=1,0,"pool.ntp.org"'
-                    success, response = self._send_at_command(ntp_config_cmd, timeout_ms=10000)
-                    if not success:
-                        print("[WIFI] ESP8285 NTP configuration failed even with default server")
-                        return False
-                else:
-                    return False
-            
-            # Get NTP time
-            success, time_response = self._send_at_command("AT+CIPSNTPTIME?", timeout_ms=15000)
+            if not self._configure_ntp(ntp_server, timezone):
+                return False
             
-            if success and "+CIPSNTPTIME:" in time_response:
-                # Extract time string from response
-                for line in time_response.split('\n'):
-                    if '+CIPSNTPTIME:' in line:
-                        time_str = line.split(':', 1)[1].strip()
-                        print(f"[WIFI] ESP8285 NTP time: {time_str}")
-                        
-                        # For ESP8285, the time is already set in the module
-                        # We just need to indicate success
-                        print("[WIFI] ESP8285 NTP time synchronized successfully")
-                        return True
+            time_field = self._query_ntp_time()
+            if time_field:
+                time_str = time_field.decode()
+                print(f"[WIFI] ESP8285 NTP time: {time_str}")
+                
+                # For ESP8285, the time is already set in the module
+                # We just need to indicate success
+                print("[WIFI] ESP8285 NTP time synchronized successfully")
+                return True
             
             print("[WIFI] ESP8285 NTP sync failed - no valid time response")
             return False
@@ -782,11 +1305,65 @@ class ESP8285WifiManager:
             print(f"[WIFI] ESP8285 NTP sync error: {e}")
             return False
     
+    def get_ntp_offset(self, ntp_server=None, timezone=0):
+        """(offset_seconds, offset_ms) of NTP time minus the local clock, or None"""
+        try:
+            if not ntp_server:
+                ntp_server = "pool.ntp.org"
+            
+            if not self._configure_ntp(ntp_server, timezone):
+                return None
+            
+            time_field = self._query_ntp_time()
+            ntp_seconds = _parse_sntp_time(time_field) if time_field else None
+            if ntp_seconds is None:
+                print("[WIFI] ESP8285 NTP offset failed - no valid time response")
+                return None
+            
+            # The module reports local time for the configured timezone; the RTC keeps UTC
+            offset = ntp_seconds - timezone * 3600 - utime.time()
+            return offset, offset * 1000
+            
+        except Exception as e:
+            print(f"[WIFI] ESP8285 NTP offset error: {e}")
+            return None
+    
+    def _configure_ntp(self, ntp_server, timezone):
+        """Point the module's SNTP client at the server, falling back to the default"""
+        # Configure NTP with timezone; the command is built once per server/timezone
+        if ntp_server == "pool.ntp.org" and timezone == 0:
+            ntp_config_cmd = _AT_CIPSNTPCFG_DEFAULT
+        else:
+            cfg = self._ntpcfg
+            if not cfg or cfg[0] != ntp_server or cfg[1] != timezone:
+                cfg = (ntp_server, timezone, f'AT+CIPSNTPCFG=1,{timezone},"{ntp_server}"\r\n'.encode())
+                self._ntpcfg = cfg
+            ntp_config_cmd = cfg[2]
+        success, response = self._send_at_command(ntp_config_cmd, timeout_ms=10000)
+        
+        if not success:
+            print("[WIFI] ESP8285 NTP configuration failed")
+            # Try with default server if custom failed
+            if ntp_server != "pool.ntp.org":
+                print("[WIFI] ESP8285 trying with default NTP server...")
+                success, response = self._send_at_command(_AT_CIPSNTPCFG_DEFAULT, timeout_ms=10000)
+                if not success:
+                    print("[WIFI] ESP8285 NTP configuration failed even with default server")
+                    return False
+            else:
+                return False
+        return True
+    
+    def _query_ntp_time(self):
+        """Raw +CIPSNTPTIME field (e.g. b"Thu Aug 04 14:48:05 2016"), or None"""
+        success, time_response = self._send_at_raw(_AT_CIPSNTPTIME_Q, timeout_ms=15000)
+        return _parse_at_response(time_response)[1].get(b"CIPSNTPTIME") if success else None
+    
     def disconnect(self):
         """Disconnect from WiFi"""
         if self.initialized and self.connected:
             try:
-                self._send_at_command("AT+CWQAP")
+                self._send_at_command(_AT_CWQAP)
                 self.connected = False
                 self.current_ssid = None
                 self.ip_address = "0.0.0.0"
@@ -814,14 +1391,20 @@ class NetworkingDriver:
         self.wifi_manager = None
         self.board_type = config.get("hardware", {}).get("board", "pico_standard")
         
+        # WiFi settings read once; the config does not change while running
+        wc = config.get("wifi", {}) or {}
+        self._wifi_cfg = wc
+        self._wifi_enabled = wc.get("enabled", False)
+        self._ntp_server = wc.get("ntp_server", "pool.ntp.org")
+        self._timezone = wc.get("timezone", 0)
+        self._networks = wc.get("networks", [])
+        
         # Auto-detect and initialize appropriate WiFi manager
         self._initialize_wifi()
     
     def _initialize_wifi(self):
         """Auto-detect and initialize WiFi based on board type"""
-        wifi_config = self.config.get("wifi", {})
-        
-        if not wifi_config.get("enabled", False):
+        if not self._wifi_enabled:
             print("[WIFI] WiFi disabled in configuration")
             return
         
@@ -830,7 +1413,7 @@ class NetworkingDriver:
             print("[WIFI] Initializing Pico W native WiFi...")
             self.wifi_manager = PicoWWifiManager(self.config)
             
-        elif wifi_config.get("type") == "esp8285":
+        elif self._wifi_cfg.get("type") == "esp8285":
             # External ESP8285 via UART
             print("[WIFI] Initializing ESP8285 via UART...")
             self.wifi_manager = ESP8285WifiManager(self.config)
@@ -853,32 +1436,96 @@ class NetworkingDriver:
             print("[WIFI] No WiFi manager available")
             return False
         
-        network_list = self.config.get("wifi", {}).get("networks", [])
+        network_list = self._networks
         if not network_list:
             print("[WIFI] No networks configured")
             return False
         
+        # The network that worked last time goes first, skipping the scan
+        cache = self._load_cache()
+        if cache:
+            if self._connect_cached(cache, network_list):
+                print("[WIFI] Connection successful")
+                self._save_cache(cache)
+                return True
+            cache = None
+        
         # Try connecting with retry logic
         for attempt in range(max_attempts):
-            print(f"[WIFI] Connection attempt {attempt + 1}/{max_attempts}")
+            _dbg(f"[WIFI] Connection attempt {attempt + 1}/{max_attempts}")
             
             if self.wifi_manager.connect_to_networks(network_list):
                 print("[WIFI] Connection successful")
+                self._save_cache(cache)
                 return True
             
+            if self.wifi_manager.auth_failed:
+                print("[WIFI] Password rejected, not retrying")
+                break
+            
             if attempt < max_attempts - 1:
-                print(f"[WIFI] Connection failed, retrying in 2 seconds...")
-                time.sleep(2)
+                # Exponential backoff, jittered so devices sharing an AP spread out
+                delay = min(30.0, 1.0 * (2 ** attempt) * (1 + random.random() * 0.5))
+                print(f"[WIFI] Connection failed, retrying in {delay:.1f} seconds...")
+                self._sleep_ms(int(delay * 1000))
         
         print(f"[WIFI] Failed to connect after {max_attempts} attempts")
         return False
     
-    def scan_networks(self):
-        """Scan for available networks"""
+    def _sleep_ms(self, ms):
+        """Wait against a ticks deadline, idling the CPU in short slices"""
+        end = utime.ticks_add(utime.ticks_ms(), ms)
+        while utime.ticks_diff(end, utime.ticks_ms()) > 0:
+            idle()
+            utime.sleep_ms(5)
+    
+    def _connect_cached(self, cache, network_list):
+        """Try the cached network, dropping the cache if it no longer works"""
+        ssid = cache.get('ssid')
+        for network_config in network_list:
+            if network_config.get('ssid') == ssid:
+                print(f"[WIFI] Trying last known network: {ssid}")
+                if self.wifi_manager.connect_cached(ssid, network_config.get('password'), cache.get('bssid')):
+                    return True
+                break
+        
+        # Network left the config, or the AP/BSSID stopped answering
+        print(f"[WIFI] Cached network {ssid} unusable, falling back to scan")
+        self._clear_cache()
+        return False
+    
+    def _load_cache(self):
+        """Read the last joined network from flash, None if absent or corrupt"""
+        try:
+            with open(_WIFI_CACHE_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _save_cache(self, cache=None):
+        """Store the current link, only touching flash when it changed"""
+        info = self.wifi_manager.get_link_info()
+        if not info or info == cache:
+            return
+        try:
+            with open(_WIFI_CACHE_FILE, 'w') as f:
+                json.dump(info, f)
+        except OSError as e:
+            print(f"[WIFI] Could not write {_WIFI_CACHE_FILE}: {e}")
+    
+    def _clear_cache(self):
+        """Forget the cached network"""
+        try:
+            os.remove(_WIFI_CACHE_FILE)
+        except OSError:
+            pass
+    
+    def scan_networks(self, force_full_scan=False):
+        """Scan for available networks; force_full_scan keeps unconfigured ones too"""
         if not self.wifi_manager:
             return []
         
-        return self.wifi_manager.scan_networks()
+        return self.wifi_manager.scan_networks(force_full_scan)
     
     def check_connection(self):
         """Check current connection status"""
@@ -887,6 +1534,16 @@ class NetworkingDriver:
         
         return self.wifi_manager.check_connection()
     
+    async def check_connection_async(self):
+        """Check connection status without blocking other tasks on slow links"""
+        if not self.wifi_manager:
+            return False
+        
+        if hasattr(self.wifi_manager, 'check_connection_async'):
+            return await self.wifi_manager.check_connection_async()
+        # Native WiFi status is a local call, no need to yield
+        return self.wifi_manager.check_connection()
+    
     def disconnect(self):
         """Disconnect from current network"""
         if self.wifi_manager:
@@ -928,10 +1585,10 @@ class NetworkingDriver:
         
         # Use configured NTP server if none provided
         if not ntp_server:
-            ntp_server = self.config.get("wifi", {}).get("ntp_server", "pool.ntp.org")
+            ntp_server = self._ntp_server
         
         # Get timezone from config
-        timezone = self.config.get("wifi", {}).get("timezone", 0)
+        timezone = self._timezone
         
         try:
             # Call appropriate NTP sync method based on WiFi type
@@ -948,6 +1605,23 @@ class NetworkingDriver:
             print(f"[WIFI] NTP sync error: {e}")
             return False
     
+    def get_ntp_offset(self, ntp_server=None):
+        """(offset_seconds, offset_ms) of NTP time minus the local clock, or None"""
+        if not self.wifi_manager or not self.wifi_manager.connected:
+            print("[WIFI] Cannot query NTP - no WiFi connection")
+            return None
+        
+        if not ntp_server:
+            ntp_server = self._ntp_server
+        
+        try:
+            if isinstance(self.wifi_manager, ESP8285WifiManager):
+                return self.wifi_manager.get_ntp_offset(ntp_server, self._timezone)
+            return self.wifi_manager.get_ntp_offset(ntp_server)
+        except Exception as e:
+            print(f"[WIFI] NTP offset error: {e}")
+            return None
+    
     def get_available_networks(self):
         """Get list of available networks from last scan"""
         if not self.wifi_manager:
@@ -962,9 +1636,7 @@ class NetworkingDriver:
     
     def activate_and_sync_time(self):
         """Activate WiFi connection and sync time, fallback to offline mode if needed"""
-        wifi_enabled = self.config.get("wifi", {}).get("enabled", False)
-        
-        if not wifi_enabled:
+        if not self._wifi_enabled:
             print("[WIFI] WiFi disabled - operating in offline mode")
             return False, "offline"
         
@@ -981,8 +1653,7 @@ class NetworkingDriver:
             print("[WIFI] Connected successfully")
             
             # Try to sync time
-            ntp_server = self.config.get("wifi", {}).get("ntp_server", "pool.ntp.org")
-            if self.sync_ntp_time(ntp_server):
+            if self.sync_ntp_time(self._ntp_server):
                 print("[WIFI] Time synchronized successfully")
                 return True, "online"
             else:
@@ -3,11 +3,44 @@ Sensors Driver - Centralized sensor management for PicoWeather
 Handles all sensor operations with automatic discovery and data caching
 """
 
+import struct
 import time
 import utime
 
 from machine import I2C, Pin
 
+# 0 = silent, 1 = info, 2 = debug; every print blocks on the UART/USB
+LOG_LEVEL = 1
+_LOG_DEBUG = 2
+
+
+def _dbg(msg):
+    """Print a per-read trace, only at debug level"""
+    if LOG_LEVEL < _LOG_DEBUG:
+        return
+    print(msg)
+
+# AHT20: trigger measurement command, result is status + 5 data bytes
+_AHT20_TRIGGER = b"\xac\x33\x00"
+_AHT20_MEASURE_MS = 80
+
+# BMP280: press_msb..temp_xlsb are contiguous, calibration is 12 LE words
+_BMP280_REG_DATA = 0xF7
+_BMP280_REG_CTRL_MEAS = 0xF4
+_BMP280_REG_CALIB = 0x88
+
+# Transient NACKs (long wires, noisy supply) get this many tries per read
+_I2C_ATTEMPTS = 3
+
+# Names for devices found on a bus but not configured
+_KNOWN_SENSORS = {
+    0x38: "AHT20",
+    0x76: "BMP280",
+    0x77: "BMP280/BME280",
+    0x48: "PCF8563 (RTC)",
+    0x68: "MPU6050"
+}
+
 
 class SensorDevice:
     """Base class for sensor devices"""
@@ -16,47 +49,75 @@ class SensorDevice:
         self.name = name
         self.i2c_bus = i2c_bus
         self.address = address
+        self.address_hex = hex(address)
         self.detected = False
         self.initialized = False
         self.last_read = 0
         self.error_count = 0
+        self.pending = False  # trigger() started a conversion read() has not collected
+        self._status = {'name': name, 'address': self.address_hex}  # Refreshed by get_status
         
-    def detect(self):
-        """Check if sensor is present"""
-        return self.address in self.i2c_bus.scan()
+    def detect(self, bus_devices=None):
+        """Check if sensor is present, against a cached scan when one is given"""
+        if bus_devices is None:
+            bus_devices = self.i2c_bus.scan()
+        return self.address in bus_devices
     
     def initialize(self):
         """Initialize sensor - to be implemented by subclasses"""
         return False
     
+    def trigger(self):
+        """Start a slow conversion ahead of read() - only for sensors that have one"""
+        pass
+    
+    def _read_retry(self, fn):
+        """Call fn, retrying I2C errors after 2 ms then 4 ms"""
+        for attempt in range(_I2C_ATTEMPTS - 1):
+            try:
+                return fn()
+            except OSError:
+                utime.sleep_ms(2 << attempt)
+        return fn()
+    
     def read(self):
         """Read sensor data - to be implemented by subclasses"""
         return {}
     
     def get_status(self):
         """Get sensor status"""
-        return {
-            'name': self.name,
-            'address': hex(self.address),
-            'detected': self.detected,
-            'initialized': self.initialized,
-            'error_count': self.error_count,
-            'last_read': self.last_read
-        }
+        status = self._status
+        status['detected'] = self.detected
+        status['initialized'] = self.initialized
+        status['error_count'] = self.error_count
+        status['last_read'] = self.last_read
+        return status
 
 
 class AHT20Sensor(SensorDevice):
     """AHT20 Temperature and Humidity Sensor"""
     
-    def __init__(self, i2c_bus, address = 0x38):
+    def __init__(self, i2c_bus, address = 0x38, cls=None):
         super().__init__("AHT20", i2c_bus, address)
         self.sensor = None
+        self._cls = cls  # lib.aht20.AHT20, imported once by the driver
+        self._buf = bytearray(6)  # Reused by every read_raw()
+        self._ready_ms = 0  # When the triggered measurement is done
         
+    @staticmethod
+    def load_library():
+        """Import the lib.aht20 driver class, None if it is missing"""
+        try:
+            from lib.aht20 import AHT20
+            return AHT20
+        except ImportError as e:
+            print(f"[SENSORS] AHT20 library unavailable: {e}")
+            return None
+    
     def initialize(self):
         """Initialize AHT20 sensor"""
         try:
-            from lib.aht20 import AHT20
-            self.sensor = AHT20(self.i2c_bus, self.address)
+            self.sensor = self._cls(self.i2c_bus, self.address)
             # Test reading to verify
             temp, humid = self.sensor.read()
             if temp is not None and humid is not None:
@@ -66,6 +127,44 @@ class AHT20Sensor(SensorDevice):
             print(f"[AHT20] Init error: {e}")
         return False
     
+    def trigger(self):
+        """Start a measurement; read() collects it once it is done"""
+        if not self.initialized:
+            return
+        try:
+            self._start()
+        except OSError:
+            pass  # read() retries the whole cycle and reports the error
+    
+    def _start(self):
+        """Send the measurement command and note when the result is due"""
+        self.i2c_bus.writeto(self.address, _AHT20_TRIGGER)
+        self._ready_ms = utime.ticks_add(utime.ticks_ms(), _AHT20_MEASURE_MS)
+        self.pending = True
+    
+    def read_raw(self):
+        """Trigger a measurement and fetch all 6 result bytes in one transaction"""
+        self._start()
+        return self.fetch()
+    
+    def fetch(self):
+        """Collect the triggered measurement, sleeping only for what is left of it"""
+        wait = utime.ticks_diff(self._ready_ms, utime.ticks_ms())
+        if wait > 0:
+            utime.sleep_ms(wait)
+        buf = self._buf
+        self.i2c_bus.readfrom_into(self.address, buf)
+        self.pending = False
+        if buf[0] & 0x80:
+            return None, None  # Still busy
+        raw_humid = (buf[1] << 12) | (buf[2] << 4) | (buf[3] >> 4)
+        raw_temp = ((buf[3] & 0x0F) << 16) | (buf[4] << 8) | buf[5]
+        return raw_temp * 200 / 1048576 - 50, raw_humid * 100 / 1048576
+    
+    def _sample(self):
+        """Fetch a triggered measurement, or run a whole cycle"""
+        return self.fetch() if self.pending else self.read_raw()
+    
     def read(self):
         """Read temperature and humidity"""
         if not self.initialized or not self.sensor:
@@ -73,7 +172,8 @@ class AHT20Sensor(SensorDevice):
             return {}
         
         try:
-            temp, humid = self.sensor.read()
+            # A failed fetch leaves the measurement pending, so a retry only re-reads it
+            temp, humid = self._read_retry(self._sample)
             self.last_read = utime.ticks_ms()
             
             if temp is not None and humid is not None:
@@ -93,24 +193,74 @@ class AHT20Sensor(SensorDevice):
 class BMP280Sensor(SensorDevice):
     """BMP280 Pressure Sensor"""
     
-    def __init__(self, i2c_bus, address = 0x76):
+    def __init__(self, i2c_bus, address = 0x76, cls=None):
         super().__init__("BMP280", i2c_bus, address)
         self.sensor = None
+        self._cls = cls  # lib.bmp280.BMP280, imported once by the driver
+        self._buf = bytearray(6)  # Reused by every read_raw()
+        self._calib = None  # dig_T1..dig_P9, None = fall back to the library read
         
+    @staticmethod
+    def load_library():
+        """Import the lib.bmp280 driver class, None if it is missing"""
+        try:
+            from lib.bmp280 import BMP280
+            return BMP280
+        except ImportError as e:
+            print(f"[SENSORS] BMP280 library unavailable: {e}")
+            return None
+    
     def initialize(self):
         """Initialize BMP280 sensor"""
         try:
-            from lib.bmp280 import BMP280
-            self.sensor = BMP280(self.i2c_bus, self.address)
+            self.sensor = self._cls(self.i2c_bus, self.address)
             # Test reading to verify
             temp, pressure = self.sensor.read()
             if temp is not None and pressure is not None:
                 self.initialized = True
+                self._load_calibration()
                 return True
         except Exception as e:
             print(f"[BMP280] Init error: {e}")
         return False
     
+    def _load_calibration(self):
+        """Read the trimming words once and keep the sensor sampling on its own"""
+        try:
+            self._calib = struct.unpack("<HhhHhhhhhhhh",
+                self.i2c_bus.readfrom_mem(self.address, _BMP280_REG_CALIB, 24))
+            # Normal mode, so every burst read sees a fresh sample
+            ctrl = self.i2c_bus.readfrom_mem(self.address, _BMP280_REG_CTRL_MEAS, 1)[0]
+            if ctrl & 0x03 != 0x03:
+                self.i2c_bus.writeto_mem(self.address, _BMP280_REG_CTRL_MEAS, bytes((ctrl | 0x03,)))
+        except OSError as e:
+            print(f"[BMP280] Calibration read failed, using library reads: {e}")
+            self._calib = None
+    
+    def read_raw(self):
+        """Burst-read pressure and temperature (0xF7..0xFC), returns (temp C, pressure hPa)"""
+        buf = self._buf
+        self.i2c_bus.readfrom_mem_into(self.address, _BMP280_REG_DATA, buf)
+        adc_p = (buf[0] << 12) | (buf[1] << 4) | (buf[2] >> 4)
+        adc_t = (buf[3] << 12) | (buf[4] << 4) | (buf[5] >> 4)
+        t1, t2, t3, p1, p2, p3, p4, p5, p6, p7, p8, p9 = self._calib
+        
+        # Datasheet floating point compensation
+        var1 = (adc_t / 16384.0 - t1 / 1024.0) * t2
+        var2 = adc_t / 131072.0 - t1 / 8192.0
+        t_fine = var1 + var2 * var2 * t3
+        
+        var1 = t_fine / 2.0 - 64000.0
+        var2 = var1 * var1 * p6 / 32768.0 + var1 * p5 * 2.0
+        var2 = var2 / 4.0 + p4 * 65536.0
+        var1 = (p3 * var1 * var1 / 524288.0 + p2 * var1) / 524288.0
+        var1 = (1.0 + var1 / 32768.0) * p1
+        if var1 == 0:
+            return t_fine / 5120.0, None
+        p = (1048576.0 - adc_p - var2 / 4096.0) * 6250.0 / var1
+        p += (p9 * p * p / 2147483648.0 + p * p8 / 32768.0 + p7) / 16.0
+        return t_fine / 5120.0, p / 100.0
+    
     def read(self):
         """Read temperature and pressure"""
         if not self.initialized or not self.sensor:
@@ -118,7 +268,7 @@ class BMP280Sensor(SensorDevice):
             return {}
         
         try:
-            temp, pressure = self.sensor.read()
+            temp, pressure = self._read_retry(self.read_raw if self._calib else self.sensor.read)
             self.last_read = utime.ticks_ms()
             
             if temp is not None and pressure is not None:
@@ -135,6 +285,13 @@ class BMP280Sensor(SensorDevice):
             return {}
 
 
+# Configurable sensors: config key, class, default address
+_SENSOR_REGISTRY = (
+    ("aht20", AHT20Sensor, 0x38),
+    ("bmp280", BMP280Sensor, 0x76),
+)
+
+
 class SensorsDriver:
     """Main sensors driver manager"""
     
@@ -143,8 +300,13 @@ class SensorsDriver:
         self.hardware = hardware
         self.sensors = {}
         self.i2c_buses = {}
+        self._bus_devices = {}  # bus_num -> set of addresses, from the last scan
+        self._unconfigured = {}  # address -> status dict, built on first sighting
         self.data_cache = {}
         self.last_update = 0
+        # Reused by read_all instead of a new dict per cycle
+        self._combined = {}
+        self._early = {}
         self.read_interval = 5000  # 5 seconds default
         
         self._initialize_i2c_buses()
@@ -183,83 +345,110 @@ class SensorsDriver:
         """Auto-discover and initialize sensors"""
         devices_config = self.config.get("devices", {}).get("sensors", {})
         
+        # One scan per bus serves detection and every later status query
+        self.rescan_i2c()
+        
         if not devices_config.get("enabled", True):
             print("[SENSORS] Sensors disabled in config")
             return
         
-        # AHT20
-        if devices_config.get("aht20", {}).get("enabled", True):
-            aht20_config = devices_config["aht20"]
-            bus_num = devices_config.get("i2c_bus", 0)
-            address = aht20_config.get("address", 0x38)
-            
-            if bus_num in self.i2c_buses:
-                aht20 = AHT20Sensor(self.i2c_buses[bus_num], address)
-                aht20.detected = aht20.detect()
-                
-                if aht20.detected:
-                    if aht20.initialize():
-                        self.sensors["aht20"] = aht20
-                        print(f"[SENSORS] AHT20 initialized at {hex(address)}")
-                    else:
-                        print(f"[SENSORS] AHT20 detected but failed to initialize")
-                else:
-                    print(f"[SENSORS] AHT20 not found at {hex(address)}")
+        bus_num = devices_config.get("i2c_bus", 0)
+        i2c_bus = self.i2c_buses.get(bus_num)
         
-        # BMP280
-        if devices_config.get("bmp280", {}).get("enabled", True):
-            bmp280_config = devices_config["bmp280"]
-            bus_num = devices_config.get("i2c_bus", 0)
-            address = bmp280_config.get("address", 0x76)
+        for key, cls, default_addr in _SENSOR_REGISTRY:
+            sensor_config = devices_config.get(key, {})
+            if not sensor_config.get("enabled", True):
+                continue
             
-            if bus_num in self.i2c_buses:
-                bmp280 = BMP280Sensor(self.i2c_buses[bus_num], address)
-                bmp280.detected = bmp280.detect()
-                
-                if bmp280.detected:
-                    if bmp280.initialize():
-                        self.sensors["bmp280"] = bmp280
-                        print(f"[SENSORS] BMP280 initialized at {hex(address)}")
-                    else:
-                        print(f"[SENSORS] BMP280 detected but failed to initialize")
+            # Library imported here, once, so init retries skip the import lookup
+            lib_cls = cls.load_library()
+            if lib_cls is None or i2c_bus is None:
+                continue
+            
+            sensor = cls(i2c_bus, sensor_config.get("address", default_addr), lib_cls)
+            sensor.detected = sensor.detect(self._bus_devices.get(bus_num))
+            
+            if sensor.detected:
+                if sensor.initialize():
+                    self.sensors[key] = sensor
+                    print(f"[SENSORS] {sensor.name} initialized at {sensor.address_hex}")
                 else:
-                    print(f"[SENSORS] BMP280 not found at {hex(address)}")
+                    print(f"[SENSORS] {sensor.name} detected but failed to initialize")
+            else:
+                print(f"[SENSORS] {sensor.name} not found at {sensor.address_hex}")
     
-    # No arquivo sensors_driver.py, ajuste o método read_all:
-
-    def read_all(self):
-        """Read data from all initialized sensors"""
-        combined_data = {}
+    def read_all(self, force=False):
+        """Read data from all initialized sensors, served from cache within read_interval"""
         current_time = utime.ticks_ms()
         
-        # Debug: mostrar quais sensores estão inicializados
-        print(f"[SENSORS] Reading {len(self.sensors)} sensors")
+        # Calls faster than read_interval are served without touching the I2C bus
+        if not force and self.data_cache and utime.ticks_diff(current_time, self.last_update) < self.read_interval:
+            return self.data_cache
+        
+        combined_data = self._combined
+        combined_data.clear()
+        
+        # Debug trace of each read cycle
+        _dbg("[SENSORS] Reading sensors")
+        
+        # Slow conversions (AHT20, ~80 ms) start first and the fast sensors
+        # are read while they run
+        for sensor in self.sensors.values():
+            sensor.trigger()
+        
+        early = self._early
+        early.clear()
+        for sensor_name, sensor in self.sensors.items():
+            if sensor.initialized and not sensor.pending:
+                early[sensor_name] = self._read_sensor(sensor_name, sensor)
         
+        # Merge in configuration order, as before
         for sensor_name, sensor in self.sensors.items():
             if sensor.initialized:
-                try:
-                    print(f"[SENSORS] Reading {sensor_name}...")
-                    sensor_data = sensor.read()
-                    if sensor_data:
-                        print(f"[SENSORS] {sensor_name} data: {sensor_data}")
-                        # Mesclar dados
-                        for key, value in sensor_data.items():
-                            combined_data[key] = value
-                    else:
-                        print(f"[SENSORS] {sensor_name} returned no data")
-                except Exception as e:
-                    print(f"[SENSORS] Error reading {sensor_name}: {e}")
-                    import sys
-                    sys.print_exception(e)
+                if sensor_name in early:
+                    sensor_data = early[sensor_name]
+                else:
+                    sensor_data = self._read_sensor(sensor_name, sensor)
+                combined_data.update(sensor_data)
             else:
-                print(f"[SENSORS] {sensor_name} not initialized")
+                _dbg("[SENSORS] Skipping uninitialized " + sensor_name)
         
+        early.clear()
         self.data_cache = combined_data
         self.last_update = current_time
         
-        print(f"[SENSORS] Combined data: {combined_data}")
+        if LOG_LEVEL >= _LOG_DEBUG:
+            print(f"[SENSORS] Combined data: {combined_data}")
         return combined_data
     
+    def read_all_into(self, out, force=False):
+        """Write the latest readings into out; None if nothing was read, else whether a value changed"""
+        data = self.read_all(force)
+        if not data:
+            return None
+        
+        changed = False
+        for key, value in data.items():
+            if out.get(key) != value:
+                out[key] = value
+                changed = True
+        return changed
+    
+    def _read_sensor(self, sensor_name, sensor):
+        """Read one sensor for read_all, {} on failure"""
+        try:
+            sensor_data = sensor.read()
+            if sensor_data:
+                if LOG_LEVEL >= _LOG_DEBUG:
+                    print(f"[SENSORS] {sensor_name} data: {sensor_data}")
+                return sensor_data
+            print(f"[SENSORS] {sensor_name} returned no data")
+        except Exception as e:
+            print(f"[SENSORS] Error reading {sensor_name}: {e}")
+            import sys
+            sys.print_exception(e)
+        return {}
+    
     def get_sensor_status(self):
         """Get status of all sensors"""
         status_list = []
@@ -268,43 +457,49 @@ class SensorsDriver:
         for sensor in self.sensors.values():
             status_list.append(sensor.get_status())
         
-        # Add detected but not configured sensors
-        for bus_num, i2c_bus in self.i2c_buses.items():
-            addresses = i2c_bus.scan()
+        # Add detected but not configured sensors (as of the last scan)
+        for bus_num, addresses in self._bus_devices.items():
             for addr in addresses:
                 # Skip if already configured
                 if any(s.address == addr for s in self.sensors.values()):
                     continue
                     
-                # Try to identify sensor type
-                known_sensors = {
-                    0x38: "AHT20",
-                    0x76: "BMP280", 
-                    0x77: "BMP280/BME280",
-                    0x48: "PCF8563 (RTC)",
-                    0x68: "MPU6050"
-                }
-                
-                sensor_name = known_sensors.get(addr, f"Unknown_{hex(addr)}")
-                status_list.append({
-                    'name': sensor_name,
-                    'address': hex(addr),
-                    'detected': True,
-                    'initialized': False,
-                    'error_count': 0,
-                    'last_read': 0,
-                    'unconfigured': True
-                })
+                status = self._unconfigured.get(addr)
+                if status is None:
+                    # Try to identify sensor type
+                    address_hex = hex(addr)
+                    status = {
+                        'name': _KNOWN_SENSORS.get(addr, "Unknown_" + address_hex),
+                        'address': address_hex,
+                        'detected': True,
+                        'initialized': False,
+                        'error_count': 0,
+                        'last_read': 0,
+                        'unconfigured': True
+                    }
+                    self._unconfigured[addr] = status
+                status_list.append(status)
         
         return status_list
     
+    def rescan_i2c(self):
+        """Refresh the cached device addresses of every bus"""
+        bus_devices = {}
+        for bus_num, i2c_bus in self.i2c_buses.items():
+            try:
+                bus_devices[bus_num] = set(i2c_bus.scan())
+            except OSError as e:
+                print(f"[SENSORS] I2C{bus_num} scan failed: {e}")
+                bus_devices[bus_num] = set()
+        self._bus_devices = bus_devices
+        return bus_devices
+    
     def scan_i2c(self):
         """Scan all I2C buses and return found devices"""
         scan_results = {}
         
-        for bus_num, i2c_bus in self.i2c_buses.items():
-            devices = i2c_bus.scan()
-            scan_results[bus_num] = [hex(addr) for addr in devices]
+        for bus_num, devices in self.rescan_i2c().items():
+            scan_results[bus_num] = [hex(addr) for addr in sorted(devices)]
             
         return scan_results
     
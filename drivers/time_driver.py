@@ -6,6 +6,61 @@ Handles all time operations including manual adjustment and NTP sync
 import time
 import utime
 import machine
+from array import array
+
+# Days before the first of each month in a common year
+_MONTH_CUM = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+
+def _is_leap(year):
+    """Gregorian leap year: divisible by 4, and by 16 when divisible by 25 (so by 400)"""
+    return (year & 3) == 0 and ((year & 15) == 0 or year % 25 != 0)
+
+
+def _days_since_epoch(year, month, day):
+    """Days from 1970-01-01 to the given date, in constant time"""
+    days = (year - 1970) * 365 + (year - 1969) // 4 - (year - 1901) // 100 + (year - 1601) // 400
+    days += _MONTH_CUM[month - 1] + day - 1
+    if month > 2 and _is_leap(year):
+        days += 1  # Leap day
+    return days
+
+
+# Weekday of January 1st (0=Monday) for each year set_manual_time accepts, 2020..2100
+_JAN1_DOW = bytes((_days_since_epoch(year, 1, 1) + 3) % 7 for year in range(2020, 2101))
+
+
+def _civil_from_days(days):
+    """(year, month, day) for a count of days since 1970-01-01 (Hinnant's algorithm)"""
+    z = days + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = mp + 3 if mp < 10 else mp - 9
+    return yoe + era * 400 + (1 if month <= 2 else 0), month, day
+
+
+def _shift_into(out, datetime, seconds):
+    """Write an RTC-format datetime moved by a number of seconds into out (weekday 0=Monday)"""
+    year, month, day, _, hour, minute, second, subsecond = datetime
+    timestamp = _days_since_epoch(year, month, day) * 86400 + hour * 3600 + minute * 60 + second + seconds
+    days = timestamp // 86400
+    seconds_of_day = timestamp % 86400
+    out[0], out[1], out[2] = _civil_from_days(days)
+    out[3] = (days + 3) % 7
+    out[4] = seconds_of_day // 3600
+    out[5] = seconds_of_day // 60 % 60
+    out[6] = seconds_of_day % 60
+    out[7] = subsecond
+    return out
+
+
+def _shift_datetime(datetime, seconds):
+    """RTC-format datetime tuple moved by a number of seconds"""
+    return tuple(_shift_into([0] * 8, datetime, seconds))
 
 
 class TimeDriver:
@@ -19,10 +74,19 @@ class TimeDriver:
         # Time settings from config
         time_config = config.get("time", {})
         self.timezone = time_config.get("timezone", 0)  # Hours from UTC
+        self._tz_offset_sec = self.timezone * 3600
+        self._local = array('i', [0] * 8)  # Reused for shifted (timezone/drift) datetimes
         self.auto_sync = time_config.get("auto_sync", True)
+        self.debug = time_config.get("debug", False)  # Routine status prints (UART writes) only when set
         self.last_sync_attempt = 0
         self.last_sync_success = 0
         self.sync_interval = 3600 * 1000  # 1 hour in milliseconds
+        self.sync_margin_ms = time_config.get("sync_margin_ms", 2)  # Offsets below this skip the RTC write
+        self.last_sync_step = 0  # Seconds the RTC was moved by the last NTP sync
+        
+        # Drift estimate from the last NTP syncs: (ticks_ms, cumulative offset ms) samples
+        self._ntp_samples = []
+        self._skew = None  # (numerator, denominator) of the RTC drift in ms per ms
         
         # Manual time settings from config
         self.manual_time_set = False
@@ -41,6 +105,14 @@ class TimeDriver:
         self.initialized = False
         self.error_count = 0
         self.has_valid_time = False
+        self._healthy = False  # Recomputed whenever the three fields above change
+        
+        self._last_utime_check = None  # (ticks_ms, utime.time()) reused by get_timestamp for 500 ms
+        
+        # Formatted strings for the current second: (time, date, time_only)
+        self._fmt_cache_key = None
+        self._fmt_cache = (None, None, None)
+        self._date_fmt = None  # (order, separator) from the locale, resolved on first use
         
         self._initialize()
     
@@ -74,7 +146,7 @@ class TimeDriver:
             print(f"[TIME] Time driver initialized, timezone: {self.timezone}")
             
         except Exception as e:
-            self.error_count += 1
+            self._bump_error()
             print(f"[TIME] Initialization error: {e}")
             # Try to set basic time as last resort
             try:
@@ -82,117 +154,134 @@ class TimeDriver:
                 self.has_valid_time = True
             except:
                 self.has_valid_time = False
+        
+        self._update_health()
+    
+    def _update_health(self):
+        """Recompute the health flag after initialized, has_valid_time or error_count changes"""
+        self._healthy = self.initialized and self.has_valid_time and self.error_count < 10
+    
+    def _bump_error(self):
+        """Count an error and refresh the health flag"""
+        self.error_count += 1
+        self._update_health()
     
     def get_current_time(self):
         """
         Get current time in MicroPython RTC format
         Returns: (year, month, day, weekday, hour, minute, second, microsecond)
+        With a timezone or drift correction this is a shared buffer, overwritten by the next call
         """
         try:
             datetime = self.rtc.datetime()
             
-            # Apply timezone offset if needed
-            if self.timezone != 0:
-                # Simple timezone adjustment (doesn't handle DST)
-                hour = datetime[4] + self.timezone
-                if hour >= 24:
-                    hour -= 24
-                    # Would need to adjust day/month/year here
-                elif hour < 0:
-                    hour += 24
-                
-                # Create new tuple with adjusted hour
-                datetime = (datetime[0], datetime[1], datetime[2], datetime[3],
-                          hour, datetime[5], datetime[6], datetime[7])
+            # Timezone offset (doesn't handle DST)
+            shift = self._tz_offset_sec
+            
+            # Compensate the RTC drift accumulated since the last NTP sync
+            skew = self._skew
+            if skew:
+                elapsed = utime.ticks_diff(utime.ticks_ms(), self._ntp_samples[-1][0])
+                if elapsed > 0:
+                    shift += int(skew[0] * elapsed // skew[1] / 1000)
+            
+            if shift:
+                # Written in place: no new tuple per call, and day/month/year carry correctly
+                return _shift_into(self._local, datetime, shift)
             
             return datetime
         except Exception as e:
-            self.error_count += 1
-            print(f"[TIME] RTC read error: {e}")
-            # Fallback to system time if RTC fails
-            try:
-                timestamp = utime.time()
-                if timestamp > 1609459200:  # 2021-01-01 (valid timestamp)
-                    dt = utime.localtime(timestamp)
-                    # MicroPython localtime returns: (year, month, mday, hour, minute, second, weekday, yearday)
-                    # RTC expects: (year, month, day, weekday, hour, minute, second, microsecond)
-                    return (dt[0], dt[1], dt[2], dt[6], dt[3], dt[4], dt[5], 0)
-            except:
-                pass
-            
-            # Ultimate fallback: return config time
+            self._bump_error()
+            if self.debug:
+                print(f"[TIME] RTC read error: {e}")
+            # System time is derived from the RTC on the Pico, so there is nothing else to try
+            # Fallback: return config time
             return (self.manual_year, self.manual_month, self.manual_day, 
                     0, self.manual_hour, self.manual_minute, self.manual_second, 0)
     
+    def _formatted(self):
+        """Formatted (time, date, time_only) strings, rebuilt only when the second changes"""
+        datetime = self.get_current_time()
+        key = (datetime[0], datetime[1], datetime[2], datetime[4], datetime[5], datetime[6])
+        if key != self._fmt_cache_key:
+            year, month, day, _, hour, minute, second, _ = datetime
+            # One %-format call each; the time-only string is the tail of the full one
+            formatted = "%04d-%02d-%02d %02d:%02d:%02d" % (year, month, day, hour, minute, second)
+            self._fmt_cache = (formatted, self._format_date(year, month, day), formatted[11:])
+            self._fmt_cache_key = key
+        return self._fmt_cache
+    
     def get_formatted_time(self):
         """Get formatted time string"""
-        year, month, day, weekday, hour, minute, second, _ = self.get_current_time()
-        return f"{year:04d}-{month:02d}-{day:02d} {hour:02d}:{minute:02d}:{second:02d}"
+        return self._formatted()[0]
     
     def get_formatted_date(self):
         """Get formatted date string"""
-        year, month, day, _, _, _, _, _ = self.get_current_time()
+        return self._formatted()[1]
+    
+    def _format_date(self, year, month, day):
+        """Format a date in the locale's order"""
+        order, sep = self._date_fmt or self._resolve_date_format()
+        
+        # Importante: ordem correta DD/MM/YYYY
+        if order == "dmy":
+            return "%02d%s%02d%s%04d" % (day, sep, month, sep, year)
+        if order == "mdy":
+            return "%02d%s%02d%s%04d" % (month, sep, day, sep, year)
         
+        # Fallback to YYYY-MM-DD
+        return "%04d-%02d-%02d" % (year, month, day)
+    
+    def _resolve_date_format(self):
+        """Parse the locale's date format into (order, separator), cached once a locale exists"""
         # Try to use locale formatting if available
         try:
             from utils.locale_manager import get_locale
             locale = get_locale()
-            if locale:
-                format_str = locale.get_display_text("formats.date")
-                # Convert format placeholders
-                # dd/mm/yyyy -> DD/MM/YYYY
-                format_lower = str(format_str).lower()
-                # Debug: mostrar qual formato está sendo usado
-                #print(f"[TIME] Using format: {format_str}")
-                
-                # Importante: ordem correta DD/MM/YYYY
-                if "dd/mm/yyyy" in format_lower:
-                    return f"{day:02d}/{month:02d}/{year:04d}"
-                elif "mm/dd/yyyy" in format_lower:
-                    return f"{month:02d}/{day:02d}/{year:04d}"
-                elif "dd-mm-yyyy" in format_lower:
-                    return f"{day:02d}-{month:02d}-{year:04d}"
+            if not locale:
+                return ("ymd", "-")  # Not cached: the locale may be set up later
+            
+            # Convert format placeholders
+            # dd/mm/yyyy -> DD/MM/YYYY
+            format_lower = str(locale.get_display_text("formats.date")).lower()
+            if "dd/mm/yyyy" in format_lower:
+                fmt = ("dmy", "/")
+            elif "mm/dd/yyyy" in format_lower:
+                fmt = ("mdy", "/")
+            elif "dd-mm-yyyy" in format_lower:
+                fmt = ("dmy", "-")
+            else:
                 # Add more formats as needed
+                fmt = ("ymd", "-")
         except:
-            pass
+            fmt = ("ymd", "-")
         
-        # Fallback to YYYY-MM-DD
-        return f"{year:04d}-{month:02d}-{day:02d}"
+        self._date_fmt = fmt
+        return fmt
     
     def get_time_only(self):
         """Get time only string"""
-        _, _, _, _, hour, minute, second, _ = self.get_current_time()
-        return f"{hour:02d}:{minute:02d}:{second:02d}"
+        return self._formatted()[2]
     
     def get_timestamp(self):
         """Get Unix timestamp"""
         try:
-            # Try to get from system time first
-            timestamp = utime.time()
+            # Try to get from system time first, at most one utime.time() call per 500 ms
+            now = utime.ticks_ms()
+            check = self._last_utime_check
+            if check and 0 <= utime.ticks_diff(now, check[0]) < 500:
+                timestamp = check[1]
+            else:
+                timestamp = utime.time()
+                self._last_utime_check = (now, timestamp)
             if timestamp > 1609459200:  # Valid timestamp (after 2021-01-01)
                 return timestamp
             
             # Calculate from RTC time
             year, month, day, _, hour, minute, second, _ = self.get_current_time()
             
-            # Simple Unix timestamp calculation (not accounting for leap years)
-            # This is approximate but works for basic timekeeping
-            days_in_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-            
-            # Calculate days since 1970-01-01
-            days = 0
-            for y in range(1970, year):
-                days += 366 if ((y % 4 == 0 and y % 100 != 0) or (y % 400 == 0)) else 365
-            
-            for m in range(1, month):
-                days += days_in_month[m-1]
-                if m == 2 and ((year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)):
-                    days += 1  # Leap day
-            
-            days += day - 1
-            
-            # Calculate total seconds
-            timestamp = days * 86400 + hour * 3600 + minute * 60 + second
+            # Calculate total seconds since 1970-01-01
+            timestamp = _days_since_epoch(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
             
             return timestamp
             
@@ -200,6 +289,65 @@ class TimeDriver:
             print(f"[TIME] Timestamp calculation error: {e}")
             return 0
     
+    def _rtc_timestamp(self):
+        """Seconds since the epoch of the RTC as stored (no timezone, no drift correction)"""
+        year, month, day, _, hour, minute, second, _ = self.rtc.datetime()
+        return _days_since_epoch(year, month, day) * 86400 + hour * 3600 + minute * 60 + second
+    
+    def _record_ntp_sample(self, offset_ms):
+        """Add an NTP offset to the drift samples and refit the skew"""
+        ticks_after = utime.ticks_ms()
+        samples = self._ntp_samples
+        # First sample is the baseline: its offset includes whatever the RTC was set to before
+        total = samples[-1][1] + offset_ms if samples else 0
+        samples.append((ticks_after, total))
+        if len(samples) > 8:
+            samples.pop(0)
+        
+        # Least squares slope of cumulative offset over time, kept as an integer fraction
+        n = len(samples)
+        self._skew = None
+        if n < 3:
+            return
+        sum_x = sum_y = sum_xy = sum_xx = 0
+        for ticks, y in samples:
+            x = utime.ticks_diff(ticks, ticks_after)
+            sum_x += x
+            sum_y += y
+            sum_xy += x * y
+            sum_xx += x * x
+        denominator = n * sum_xx - sum_x * sum_x
+        if denominator:
+            self._skew = (n * sum_xy - sum_x * sum_y, denominator)
+    
+    def _set_rtc_unchecked(self, year, month, day, hour, minute, second):
+        """Write an already validated date and time (year 2020..2100) to the RTC"""
+        # Calculate weekday (0=Monday, 6=Sunday) from the table of January 1st weekdays
+        day_of_year = _MONTH_CUM[month - 1] + day - 1
+        if month > 2 and _is_leap(year):
+            day_of_year += 1
+        weekday = (_JAN1_DOW[year - 2020] + day_of_year) % 7
+        
+        # Set RTC time
+        self.rtc.datetime((year, month, day, weekday, hour, minute, second, 0))
+        
+        # A manual step would read as drift at the next sync
+        self._ntp_samples = []
+        self._skew = None
+        self._last_utime_check = None
+        
+        # Update manual settings
+        self.manual_year = year
+        self.manual_month = month
+        self.manual_day = day
+        self.manual_hour = hour
+        self.manual_minute = minute
+        self.manual_second = second
+        self.manual_time_set = True
+        self.has_valid_time = True
+        self._update_health()
+        return True
+    
     def set_manual_time(self, year, month, day, 
                        hour, minute, second = 0):
         """Set time manually"""
@@ -224,96 +372,48 @@ class TimeDriver:
                 print(f"[TIME] Invalid second: {second}")
                 return False
             
-            # Calculate weekday (0=Monday, 6=Sunday)
-            # Zeller's Congruence algorithm for weekday calculation
-            if month < 3:
-                month += 12
-                year -= 1
-            
-            century = year // 100
-            year_in_century = year % 100
-            
-            weekday = (day + ((13 * (month + 1)) // 5) + year_in_century + 
-                      (year_in_century // 4) + (century // 4) - (2 * century)) % 7
-            
-            # Convert to MicroPython format (0=Monday, 6=Sunday)
-            # Zeller gives 0=Saturday, 1=Sunday, ..., 6=Friday
-            # So we adjust: 0=Monday, 1=Tuesday, ..., 6=Sunday
-            weekday = (weekday + 1) % 7
+            self._set_rtc_unchecked(year, month, day, hour, minute, second)
             
-            # Set RTC time
-            self.rtc.datetime((year, month, day, weekday, hour, minute, second, 0))
-            
-            # Update manual settings
-            self.manual_year = year
-            self.manual_month = month
-            self.manual_day = day
-            self.manual_hour = hour
-            self.manual_minute = minute
-            self.manual_second = second
-            self.manual_time_set = True
-            self.has_valid_time = True
-            
-            print(f"[TIME] Manual time set: {self.get_formatted_time()}")
+            if self.debug:
+                print(f"[TIME] Manual time set: {self.get_formatted_time()}")
             return True
             
         except Exception as e:
-            self.error_count += 1
+            self._bump_error()
             print(f"[TIME] Manual time set error: {e}")
             return False
     
     def adjust_time(self, minutes = 0, hours = 0, days = 0):
         """Adjust current time by specified amounts"""
         try:
-            current_time = self.get_current_time()
-            year, month, day, weekday, hour, minute, second, _ = current_time
-            
-            # Convert to timestamp for easier adjustment
-            timestamp = self.get_timestamp()
+            # RTC values as stored (no timezone), so the write below round-trips
+            timestamp = self._rtc_timestamp()
             
             # Apply adjustments in seconds
             timestamp += days * 86400 + hours * 3600 + minutes * 60
             
-            # Convert back to datetime
-            # Note: This is simplified - would need proper conversion
-            # For now, we'll use the simple method
-            
-            # Simple adjustment (doesn't handle month/year boundaries well)
-            new_minute = minute + minutes
-            carry_hours = new_minute // 60
-            new_minute = new_minute % 60
+            # Convert back to datetime; carries across months and years come out of the arithmetic
+            year, month, day = _civil_from_days(timestamp // 86400)
+            seconds_of_day = timestamp % 86400
             
-            new_hour = hour + hours + carry_hours
-            carry_days = new_hour // 24
-            new_hour = new_hour % 24
-            
-            new_day = day + days + carry_days
-            
-            # Handle month/year carry (simplified)
-            days_in_month = [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
-            if ((year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)):
-                days_in_month[1] = 29  # February in leap year
-            
-            while new_day > days_in_month[month - 1]:
-                new_day -= days_in_month[month - 1]
-                month += 1
-                if month > 12:
-                    month = 1
-                    year += 1
-                    # Recalculate leap year
-                    days_in_month[1] = 29 if ((year % 4 == 0 and year % 100 != 0) or (year % 400 == 0)) else 28
+            # Fields come out of the arithmetic in range; only the year can leave the table
+            if not (2020 <= year <= 2100):
+                print(f"[TIME] Invalid year: {year}")
+                return False
             
-            return self.set_manual_time(year, month, new_day, new_hour, new_minute, second)
+            return self._set_rtc_unchecked(year, month, day, seconds_of_day // 3600,
+                                           seconds_of_day // 60 % 60, seconds_of_day % 60)
             
         except Exception as e:
-            self.error_count += 1
+            self._bump_error()
             print(f"[TIME] Time adjustment error: {e}")
             return False
     
     def sync_with_ntp(self, timeout_ms = 10000):
         """Synchronize time with NTP server using network driver"""
         if not self.auto_sync:
-            print("[TIME] Auto sync disabled")
+            if self.debug:
+                print("[TIME] Auto sync disabled")
             return False
         
         try:
@@ -326,28 +426,42 @@ class TimeDriver:
             
             self.last_sync_attempt = current_time_ms
             
-            print(f"[TIME] Attempting NTP sync with {self.ntp_server}")
+            if self.debug:
+                print(f"[TIME] Attempting NTP sync with {self.ntp_server}")
             
             # Try to sync using network driver
             if self.network_driver and self.network_driver.is_connected():
                 try:
-                    if self.network_driver.sync_ntp_time(self.ntp_server):
+                    offset = self.network_driver.get_ntp_offset(self.ntp_server)
+                    if offset:
+                        offset_seconds, offset_ms = offset
+                        if abs(offset_ms) < self.sync_margin_ms:
+                            # Within tolerance: leave the RTC alone so readers see no jump
+                            self.last_sync_step = 0
+                        else:
+                            self.rtc.datetime(_shift_datetime(self.rtc.datetime(), offset_seconds))
+                            self.last_sync_step = offset_seconds
+                            self._last_utime_check = None
+                        self._record_ntp_sample(offset_ms)
                         self.last_sync_success = current_time_ms
                         self.has_valid_time = True
-                        print(f"[TIME] NTP sync successful: {self.get_formatted_time()}")
+                        self._update_health()
+                        if self.debug:
+                            print(f"[TIME] NTP sync successful: {self.get_formatted_time()} (step {self.last_sync_step}s)")
                         return True
-                    else:
+                    elif self.debug:
                         print("[TIME] Network driver NTP sync failed")
                 except Exception as nd_error:
                     print(f"[TIME] Network driver NTP error: {nd_error}")
-            else:
+            elif self.debug:
                 print("[TIME] No network connection available for NTP sync")
             
-            print("[TIME] NTP sync failed - continuing with current time")
+            if self.debug:
+                print("[TIME] NTP sync failed - continuing with current time")
             return False
             
         except Exception as e:
-            self.error_count += 1
+            self._bump_error()
             print(f"[TIME] NTP sync error: {e}")
             return False
     
@@ -365,39 +479,50 @@ class TimeDriver:
         return False
     
     def get_status(self):
-        """Get time system status"""
-        current_time_ms = utime.ticks_ms()
-        
+        """Get time system status (cheap fields only, no RTC read)"""
         status = {
             'initialized': self.initialized,
             'has_valid_time': self.has_valid_time,
-            'current_time': self.get_formatted_time(),
             'timezone': self.timezone,
             'auto_sync': self.auto_sync,
             'manual_time_set': self.manual_time_set,
             'error_count': self.error_count,
-            'ntp_server': self.ntp_server,
-            'timestamp': self.get_timestamp()
+            'ntp_server': self.ntp_server
         }
         
         if self.auto_sync:
             status['last_sync_attempt'] = self.last_sync_attempt
             status['last_sync_success'] = self.last_sync_success
+            status['last_sync_step'] = self.last_sync_step
             
             if self.last_sync_success > 0:
-                time_since_sync = utime.ticks_diff(current_time_ms, self.last_sync_success) // 1000
+                time_since_sync = utime.ticks_diff(utime.ticks_ms(), self.last_sync_success) // 1000
                 status['time_since_sync'] = f"{time_since_sync}s"
             else:
                 status['time_since_sync'] = "Never"
         
         return status
     
+    def get_status_detailed(self):
+        """Get time system status including the current time and timestamp"""
+        status = self.get_status()
+        status['current_time'] = self.get_formatted_time()
+        status['timestamp'] = self.get_timestamp()
+        return status
+    
     def set_timezone(self, timezone_hours):
         """Set timezone offset from UTC"""
         if -12 <= timezone_hours <= 14:  # Valid timezone range
             self.timezone = timezone_hours
+            self._tz_offset_sec = timezone_hours * 3600
+            self.reset_date_format()
             print(f"[TIME] Timezone set to {timezone_hours}")
     
+    def reset_date_format(self):
+        """Re-read the date format from the locale on next use (after a locale change)"""
+        self._date_fmt = None
+        self._fmt_cache_key = None
+    
     def enable_auto_sync(self, enabled):
         """Enable/disable automatic NTP sync"""
         self.auto_sync = enabled
@@ -423,11 +548,12 @@ class TimeDriver:
     def reset_error_count(self):
         """Reset error counter"""
         self.error_count = 0
+        self._update_health()
     
     def is_healthy(self):
         """Check if time system is healthy"""
-        # Time driver is considered healthy if initialized and has valid time
-        return self.initialized and self.has_valid_time and self.error_count < 10
+        # Time driver is considered healthy if initialized and has valid time (kept by _update_health)
+        return self._healthy
     
     def force_sync(self):
         """Force immediate NTP sync"""
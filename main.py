@@ -8,6 +8,7 @@ import time
 import utime
 import machine
 import sys
+import uasyncio as asyncio
 
 # Import drivers
 from drivers.hardware_config import get_hardware_config
@@ -50,9 +51,14 @@ class PicoWeatherSystem:
         self.sensor_update_count = 0
         self.first_sensor_read = True  # Flag para primeira leitura
         
+        # Display change tracking: only the pixels that differ from this frame are sent
+        self._last_frame = None  # Copy of the last frame sent to the display
+        self._pages = 8  # 8-pixel rows in a frame, set from the panel height below
+        
         # Load configuration
         if not self._load_configuration():
             raise RuntimeError("Failed to load configuration")
+        self._pages = self.config.get("display", {}).get("height", 64) // 8
         
         # Initialize locale system
         locale_code = self.config.get("system", {}).get("locale", "pt_BR")
@@ -191,9 +197,7 @@ class PicoWeatherSystem:
             self.drivers['sensors'] = SensorsDriver(self.config, self.hardware)
             if self.drivers['sensors'].is_healthy():
                 # Leitura IMEDIATA dos sensores para ter dados iniciais
-                initial_data = self.drivers['sensors'].read_all()
-                if initial_data:
-                    self.sensor_data = initial_data.copy()
+                if self.drivers['sensors'].read_all_into(self.sensor_data) is not None:
                     print("OK")
                     init_status.append("SENSORS: OK")
                 else:
@@ -217,8 +221,7 @@ class PicoWeatherSystem:
                 self.drivers['controller'] = ControllerDriver(self.config, self.hardware)
                 if self.drivers['controller'].is_healthy():
                     # Get initial controller data
-                    initial_controller_data = self.drivers['controller'].get_controller_data()
-                    self.controller_data = initial_controller_data.copy()
+                    self.drivers['controller'].get_controller_data_into(self.controller_data)
                     print("OK")
                     init_status.append("CONTROLLERS: OK")
                 else:
@@ -264,10 +267,8 @@ class PicoWeatherSystem:
         # Inicializar dados de tempo
         if self.drivers.get('time'):
             try:
-                self.time_data = {
-                    'time_only': self.drivers['time'].get_time_only(),
-                    'date': self.drivers['time'].get_formatted_date()
-                }
+                self.time_data['time_only'] = self.drivers['time'].get_time_only()
+                self.time_data['date'] = self.drivers['time'].get_formatted_date()
                 print(f"[INIT] Time data: {self.time_data['time_only']} {self.time_data['date']}")
             except Exception as e:
                 print(f"[INIT] Time data: FAIL ({e})")
@@ -286,10 +287,8 @@ class PicoWeatherSystem:
         return True
         if self.drivers.get('time'):
             try:
-                self.time_data = {
-                    'time_only': self.drivers['time'].get_time_only(),
-                    'date': self.drivers['time'].get_formatted_date()
-                }
+                self.time_data['time_only'] = self.drivers['time'].get_time_only()
+                self.time_data['date'] = self.drivers['time'].get_formatted_date()
                 print(f"[INIT] Time data: {self.time_data['time_only']} {self.time_data['date']}")
             except Exception as e:
                 print(f"[INIT] Time data: FAIL ({e})")
@@ -447,14 +446,13 @@ class PicoWeatherSystem:
         sensors = self.drivers.get('sensors')
         if sensors and sensors.is_healthy():
             try:
-                new_data = sensors.read_all()
-                if new_data:
-                    self.sensor_data = new_data.copy()
+                # Leitura escrita direto em self.sensor_data, sem dict novo
+                if sensors.read_all_into(self.sensor_data) is not None:
                     self.last_sensor_update = utime.ticks_ms()
                     self.sensor_update_count += 1
                     if self.first_sensor_read:
                         self.first_sensor_read = False
-                        log_sensor_update(new_data)  # Log limpo da primeira leitura
+                        log_sensor_update(self.sensor_data)  # Log limpo da primeira leitura
             except Exception as e:
                 print(f"[SENSORS] Read error: {e}")
     
@@ -464,13 +462,6 @@ class PicoWeatherSystem:
             return
         
         try:
-            # Prepare data for display manager
-            display_data = {
-                'sensor_data': self.sensor_data,
-                'controller_data': self.controller_data,
-                'time_data': self.time_data
-            }
-            
             # Generate framebuffer
             framebuffer = self.display_manager.generate_framebuffer(
                 self.sensor_data, 
@@ -481,12 +472,53 @@ class PicoWeatherSystem:
                 # Show via display driver
                 display_driver = self.drivers.get('display')
                 if display_driver and display_driver.is_healthy():
-                    success = display_driver.show_framebuffer(framebuffer)
+                    success = self._show_changes(display_driver, framebuffer)
                     if not success:
                         print("[DISPLAY] Failed to show framebuffer")
         except Exception as e:
             print(f"[DISPLAY] Update error: {e}")
     
+    def _show_changes(self, display_driver, framebuffer):
+        """Send only the window of the frame that differs from the last one sent"""
+        last = self._last_frame
+        if not isinstance(framebuffer, (bytes, bytearray)) or last is None or len(last) != len(framebuffer):
+            success = display_driver.show_framebuffer(framebuffer)
+            if success and isinstance(framebuffer, (bytes, bytearray)):
+                self._last_frame = bytearray(framebuffer)
+            return success
+        
+        # Dirty pages (8-pixel rows), compared a page at a time
+        pages = self._pages
+        width = len(framebuffer) // pages
+        first_page = last_page = -1
+        for page in range(pages):
+            start = page * width
+            if framebuffer[start:start + width] != last[start:start + width]:
+                if first_page < 0:
+                    first_page = page
+                last_page = page
+        if first_page < 0:
+            return True  # Identical frame, nothing to send
+        
+        # Narrow the columns inside the dirty pages
+        first_col, last_col = width, -1
+        for page in range(first_page, last_page + 1):
+            start = page * width
+            col = 0
+            while col < first_col and framebuffer[start + col] == last[start + col]:
+                col += 1
+            first_col = min(first_col, col)
+            col = width - 1
+            while col > last_col and framebuffer[start + col] == last[start + col]:
+                col -= 1
+            last_col = max(last_col, col)
+        
+        success = display_driver.show_region(framebuffer, first_col, first_page * 8,
+                                             last_col - first_col + 1, (last_page - first_page + 1) * 8)
+        if success:
+            last[:] = framebuffer
+        return success
+    
     def enter_console_mode(self):
         """Enter console mode for debugging - system continues running"""
         log_system_event("Entrando no modo console - sistema continua operando")
@@ -506,95 +538,16 @@ class PicoWeatherSystem:
 # THREAD METHOD REMOVIDO - Sistema agora é completamente síncrono
     
     def start_main_loop(self):
-        """Main application loop - synchronous sensor reading for RP2040"""
-        print("[MAIN] Starting main loop (synchronous sensor mode)")
+        """Main application loop - one uasyncio task per periodic job"""
+        print("[MAIN] Starting main loop (asyncio tasks)")
         self.running = True
         
-        last_display_update = 0
-        last_input_check = 0
-        last_wifi_check = 0
-        last_time_update = 0
-        last_sensor_read = 0
-        
-        display_interval = 1000  # Update display every second
-        input_interval = 50      # Check buttons every 50ms
-        wifi_interval = 30000    # Check WiFi every 30 seconds
-        time_update_interval = 1000  # Update time every second
-        sensor_read_interval = 5000  # Read sensors every 5 seconds (async simulation)
-        
         try:
-            while self.running:
-                current_time = utime.ticks_ms()
-                
-                # Check for button presses
-                if utime.ticks_diff(current_time, last_input_check) > input_interval:
-                    input_driver = self.drivers.get('input')
-                    if input_driver and input_driver.is_enabled():
-                        events = input_driver.check_all()
-                        if events:
-                            print(f"[INPUT] Events: {events}")
-                    
-                    last_input_check = current_time
-                
-                # Update time data periodically
-                time_driver = self.drivers.get('time')
-                if time_driver and utime.ticks_diff(current_time, last_time_update) > time_update_interval:
-                    try:
-                        self.time_data = {
-                            'time_only': time_driver.get_time_only(),
-                            'date': time_driver.get_formatted_date()
-                        }
-                        last_time_update = current_time
-                    except Exception as e:
-                        print(f"[TIME] Update error: {e}")
-                
-                # Update sensors (synchronous)
-                if utime.ticks_diff(current_time, last_sensor_read) > sensor_read_interval:
-                    try:
-                        self._read_sensors_sync()
-                    except Exception as e:
-                        print(f"[SENSORS] Sync read error: {e}")
-                    last_sensor_read = current_time
-                
-                # Update display
-                if utime.ticks_diff(current_time, last_display_update) > display_interval:
-                    try:
-                        self._update_display()
-                    except Exception as e:
-                        print(f"[DISPLAY] Update error in main loop: {e}")
-                    last_display_update = current_time
-                
-                # Check WiFi connection status (less frequent)
-                networking_driver = self.drivers.get('networking')
-                if networking_driver and utime.ticks_diff(current_time, last_wifi_check) > wifi_interval:
-                    try:
-                        was_connected = networking_driver.is_connected()
-                        is_connected = networking_driver.check_connection()
-                        
-                        if was_connected and not is_connected:
-                            print("[WIFI] Connection lost")
-                        elif not was_connected and is_connected:
-                            print("[WIFI] Connection restored")
-                        
-                        last_wifi_check = current_time
-                    except Exception as e:
-                        print(f"[WIFI] Check error: {e}")
-                
-                # Check time sync (every minute)
-                if time_driver and utime.ticks_diff(current_time, last_wifi_check) > 60000:
-                    try:
-                        time_driver.check_and_sync()
-                    except Exception as e:
-                        print(f"[TIME] Sync error: {e}")
-                
-                # Small delay to prevent busy waiting
-                time.sleep(0.01)
+            asyncio.run(self._run_async())
                 
         except KeyboardInterrupt:
             log_system_event("CTRL+C pressionado - ativando modo console")
             self.enter_console_mode()
-            # Continue running after console exit
-            # No continue needed - will go back to while loop
         except Exception as e:
             print(f"[MAIN] Main loop error: {e}")
             self.error_count += 1
@@ -603,6 +556,93 @@ class PicoWeatherSystem:
                 print("[MAIN] Too many errors, entering console mode")
                 self.enter_console_mode()
     
+    async def _run_async(self):
+        """Start the periodic tasks and wait for them; the loop sleeps until the next deadline"""
+        tasks = [
+            asyncio.create_task(self._input_task()),
+            asyncio.create_task(self._time_task()),
+            asyncio.create_task(self._sensor_task()),
+            asyncio.create_task(self._display_task()),
+            asyncio.create_task(self._wifi_task())
+        ]
+        await asyncio.gather(*tasks)
+    
+    async def _input_task(self):
+        """Handle button events, woken by the GPIO IRQ instead of polling"""
+        input_driver = self.drivers.get('input')
+        if not input_driver or not input_driver.is_enabled():
+            return
+        
+        while self.running:
+            try:
+                events = await input_driver.wait_events()
+                if events:
+                    print(f"[INPUT] Events: {events}")
+            except Exception as e:
+                print(f"[INPUT] Check error: {e}")
+                await asyncio.sleep_ms(50)
+    
+    async def _time_task(self):
+        """Update time data every second and check whether an NTP sync is due"""
+        time_driver = self.drivers.get('time')
+        if not time_driver:
+            return
+        
+        while self.running:
+            try:
+                # Same strings come back until the RTC second advances; refresh the dict in place
+                time_only = time_driver.get_time_only()
+                if time_only != self.time_data['time_only']:
+                    self.time_data['time_only'] = time_only
+                    self.time_data['date'] = time_driver.get_formatted_date()
+            except Exception as e:
+                print(f"[TIME] Update error: {e}")
+            
+            # One ticks_diff against the sync interval when no sync is due
+            try:
+                time_driver.check_and_sync()
+            except Exception as e:
+                print(f"[TIME] Sync error: {e}")
+            
+            await asyncio.sleep_ms(1000)
+    
+    async def _sensor_task(self):
+        """Read sensors every 5 seconds"""
+        while self.running:
+            try:
+                self._read_sensors_sync()
+            except Exception as e:
+                print(f"[SENSORS] Sync read error: {e}")
+            await asyncio.sleep_ms(5000)
+    
+    async def _display_task(self):
+        """Update display every second"""
+        while self.running:
+            try:
+                self._update_display()
+            except Exception as e:
+                print(f"[DISPLAY] Update error in main loop: {e}")
+            await asyncio.sleep_ms(1000)
+    
+    async def _wifi_task(self):
+        """Check WiFi connection status every 30 seconds"""
+        networking_driver = self.drivers.get('networking')
+        if not networking_driver:
+            return
+        
+        while self.running:
+            await asyncio.sleep_ms(30000)
+            try:
+                was_connected = networking_driver.is_connected()
+                is_connected = await networking_driver.check_connection_async()
+                
+                if was_connected and not is_connected:
+                    print("[WIFI] Connection lost")
+                elif not was_connected and is_connected:
+                    print("[WIFI] Connection restored")
+            except Exception as e:
+                print(f"[WIFI] Check error: {e}")
+    
     def _initialize_sensor_cache_sync(self):
         """Initialize sensor cache synchronously before main loop"""
         print("[MAIN] Initializing sensor cache synchronously...")
@@ -613,18 +653,15 @@ class PicoWeatherSystem:
             
             # Read sensors synchronously
             if sensors and sensors.is_healthy():
-                new_sensor_data = sensors.read_all()
-                if new_sensor_data:
-                    self.sensor_data = new_sensor_data.copy()
-                    self.sensor_cache = new_sensor_data.copy()
+                if sensors.read_all_into(self.sensor_data) is not None:
+                    self.sensor_cache.update(self.sensor_data)
                     self.last_sensor_update = utime.ticks_ms()
-                    print(f"[SENSORS_SYNC] Updated: {new_sensor_data}")
+                    print(f"[SENSORS_SYNC] Updated: {self.sensor_data}")
             
             # Read controllers synchronously
             if controller and controller.is_healthy():
-                new_controller_data = controller.get_controller_data()
-                self.controller_data = new_controller_data.copy()
-                print(f"[MAIN] Controller data initialized: {new_controller_data}")
+                controller.get_controller_data_into(self.controller_data)
+                print(f"[MAIN] Controller data initialized: {self.controller_data}")
             return True
                     
         except Exception as e:
@@ -397,7 +397,7 @@ class PicoWeatherConsole:
         
         # Get time status from time_driver
         try:
-            status = time_driver.get_status()
+            status = time_driver.get_status_detailed()
             
             print("\nTIME INFORMATION:")
             print(f"  Current time: {status.get('current_time', 'Unknown')}")
@@ -757,8 +757,8 @@ class PicoWeatherConsole:
         elif cmd == "scan":
             print("Scanning for WiFi networks...")
             try:
-                # Use networking_driver to scan networks
-                networks = networking_driver.scan_networks()
+                # Use networking_driver to scan networks, listing every AP in range
+                networks = networking_driver.scan_networks(force_full_scan=True)
                 
                 if not networks:
                     print("  No networks found")
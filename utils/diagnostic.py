@@ -172,7 +172,7 @@ class SystemDiagnostic:
                     
                     spi = SPI(
                         spi_bus,
-                        baudrate=display_config.get('spi_settings', {}).get('baudrate', 200000),
+                        baudrate=display_config.get('spi_settings', {}).get('baudrate', 8000000),
                         polarity=display_config.get('spi_settings', {}).get('polarity', 1),
                         phase=display_config.get('spi_settings', {}).get('phase', 1),
                         sck=Pin(sck_pin),
@@ -267,7 +267,7 @@ class SystemDiagnostic:
             
             # Test reading sensors
             print("  Testing sensor readings...")
-            sensor_data = sensors_driver.read_all()
+            sensor_data = sensors_driver.read_all(force=True)
             if sensor_data:
                 print(f"    Data received: {list(sensor_data.keys())}")
                 for key, value in sensor_data.items():
@@ -411,7 +411,7 @@ class SystemDiagnostic:
         
         try:
             is_healthy = time_driver.is_healthy()
-            status = time_driver.get_status()
+            status = time_driver.get_status_detailed()
             
             print(f"  Time health: {'✅ Healthy' if is_healthy else '❌ Unhealthy'}")
             print(f"  Current time: {status.get('current_time', 'Unknown')}")